@@ -1,8 +1,8 @@
 from enum import Enum
 from typing import Optional, List, Pattern, Dict
-from colorama import Fore, Style
 from datetime import datetime
-import yaml
+import csv
+import hashlib
 import re
 
 #------------------------------------------------------------------------------------------------
@@ -23,22 +23,84 @@ BankType = Enum(
   ]
 )
 
+#------------------------------------------------------------------------------------------------
+g_NumericDateFormat = re.compile( r'%([Ymd])([^%0-9A-Za-z]?)%([Ymd])\2%([Ymd])' )
+g_DateFieldWidths   = { 'Y' : 4, 'm' : 2, 'd' : 2 }
+
+# Parses dates in a strptime format. Numeric formats made of %Y, %m and %d (like %m/%d/%Y, %Y%m%d
+#  or %m_%d_%Y) are parsed by splitting or slicing the text. Other formats, and text the fast path
+#  doesn't recognize, go through strptime, so bad dates fail the same way they always have
+class DateParser:
+  date_fmt  : str
+  separator : Optional[str]
+  fields    : Optional[List[str]]
+  offsets   : Optional[List[int]]
+
+  def __init__( self, date_fmt : str ) -> None:
+    self.date_fmt  = date_fmt
+    self.separator = None
+    self.fields    = None
+    self.offsets   = None
+
+    m = g_NumericDateFormat.fullmatch( date_fmt )
+    if m is not None and sorted( [ m.group(1), m.group(3), m.group(4) ] ) == [ 'Y', 'd', 'm' ]:
+      self.separator = m.group(2)
+      self.fields    = [ m.group(1), m.group(3), m.group(4) ]
+      self.offsets   = [ 0 ]
+      for field in self.fields:
+        self.offsets.append( self.offsets[-1] + g_DateFieldWidths[ field ] )
+
+  def __call__( self, text : str ) -> datetime:
+    if self.fields is not None:
+      if self.separator == '':
+        parts = [ text[ begin:end ] for begin, end in zip( self.offsets, self.offsets[ 1: ] ) ] if len( text ) == self.offsets[-1] else []
+      else:
+        parts = text.split( self.separator )
+
+      if len( parts ) == 3:
+        values = {}
+        for field, part in zip( self.fields, parts ):
+          if not ( part.isascii() and part.isdigit() ) or len( part ) > g_DateFieldWidths[ field ] or ( field == 'Y' and len( part ) != 4 ):
+            break
+          values[ field ] = int( part )
+        else:
+          try:
+            return datetime( values[ 'Y' ], values[ 'm' ], values[ 'd' ] )
+          except ValueError:
+            pass
+
+    return datetime.strptime( text, self.date_fmt )
+
+#------------------------------------------------------------------------------------------------
+# colorama is only loaded (and set up to color the console) the first time there's a warning
+g_ColoramaReady = False
+
+def PrintWarning( message : str ) -> None:
+  global g_ColoramaReady
+  import colorama
+  if not g_ColoramaReady:
+    colorama.init()
+    g_ColoramaReady = True
+  print( f'{colorama.Fore.YELLOW}Warning: {message}{colorama.Style.RESET_ALL}' )
+
 #------------------------------------------------------------------------------------------------
 class DateMatch:
-  re_match : Pattern
-  dt_fmt   : str
+  re_match  : Pattern
+  dt_fmt    : str
+  dt_parser : DateParser
 
   def __init__( self, re_match : str, dt_fmt : str ) -> None:
-    self.re_match = re.compile( re_match )
-    self.dt_fmt   = dt_fmt
+    self.re_match  = re.compile( re_match )
+    self.dt_fmt    = dt_fmt
+    self.dt_parser = DateParser( dt_fmt )
 
   def Match( self, filename : str, debug_name : str, debug_bank_name : str ) -> datetime:
     m = re.match( self.re_match, filename )
     if m is not None:
       date_str = m.group(1)
-      return datetime.strptime( date_str, self.dt_fmt )
+      return self.dt_parser( date_str )
     else:
-      print( f'{Fore.YELLOW}Warning: statement {debug_name} pattern for bank {debug_bank_name} did not match filename {filename}{Style.RESET_ALL}')
+      PrintWarning( f'statement {debug_name} pattern for bank {debug_bank_name} did not match filename {filename}' )
     return None
 
 #------------------------------------------------------------------------------------------------
@@ -49,6 +111,7 @@ class BankInfo:
   amount_idx         : int
   date_idx           : int
   date_fmt           : str
+  date_parser        : DateParser
   name_idx           : int
   date_begin_pattern : Optional[DateMatch]
   date_end_pattern   : Optional[DateMatch]
@@ -61,6 +124,7 @@ class BankInfo:
     self.amount_idx         = -1
     self.date_idx           = -1
     self.date_fmt           = '%m/%d/%Y'
+    self.date_parser        = DateParser( self.date_fmt )
     self.name_idx           = -1
     self.date_begin_pattern = None
     self.date_end_pattern   = None
@@ -87,7 +151,8 @@ class BankInfo:
         self.date_idx = self.headers.index( bank_info_yaml[ 'DateHeader' ] )
 
       if 'DateFormat' in bank_info_yaml.keys():
-        self.date_fmt = bank_info_yaml[ 'DateFormat' ]
+        self.date_fmt    = bank_info_yaml[ 'DateFormat' ]
+        self.date_parser = DateParser( self.date_fmt )
 
       if 'NameHeader' in bank_info_yaml.keys():
         self.name_idx = self.headers.index( bank_info_yaml[ 'NameHeader' ] )
@@ -104,24 +169,43 @@ class BankInfo:
         self.account_id_pattern = re.compile( bank_info_yaml[ 'AccountId' ] )
 
 
+#------------------------------------------------------------------------------------------------
+g_ByteOrderMarks = [ '\ufeff', '\u00ef\u00bb\u00bf' ] # utf-8 BOM as read in utf-8, and in cp1252
+
+# a csv header line as comparable text: no BOM, no quoting, no whitespace around the fields
+def NormalizeHeader( header : str ) -> str:
+  for bom in g_ByteOrderMarks:
+    if header.startswith( bom ):
+      header = header[ len( bom ): ]
+  fields = next( csv.reader( [ header.strip() ], skipinitialspace=True ), [] )
+  return ','.join( field.strip() for field in fields )
+
+#------------------------------------------------------------------------------------------------
 class BankManager:
-  banks: Dict[ Bank, BankInfo ]
+  banks       : Dict[ Bank, BankInfo ]
+  header_map  : Dict[ str, BankInfo ]
+  config_hash : str
 
   def __init__( self, bank_config_abs_path : str ) -> None:
-    self.banks = {}
+    import yaml
+    self.banks      = {}
+    self.header_map = {}
 
     with open( bank_config_abs_path, 'r' ) as bank_file:
-      bank_yaml = yaml.safe_load( bank_file )
+      bank_text = bank_file.read()
+      bank_yaml = yaml.safe_load( bank_text )
+      self.config_hash = hashlib.sha256( bank_text.encode( 'utf-8' ) ).hexdigest()
 
       for bank in Bank:
         new_bank = BankInfo( bank )
         new_bank.ReadFromYaml( bank_yaml )
         self.banks[ bank ] = new_bank
+        if len( new_bank.headers ) > 0:
+          self.header_map.setdefault( ','.join( header.strip() for header in new_bank.headers ), new_bank )
+
+  def IdentifyHeader( self, header : str ) -> Optional[BankInfo]:
+    return self.header_map.get( NormalizeHeader( header ) )
 
   def IdentifyStatement( self, csv_path : str ) -> Optional[BankInfo]:
-    with open( csv_path, 'r' ) as csv:
-      header = csv.readline()
-      for bank, bank_info in self.banks.items():
-        if ','.join(bank_info.headers) == header.strip():
-          return self.banks[ bank ]
-    return None
\ No newline at end of file
+    with open( csv_path, 'r' ) as csv_file:
+      return self.IdentifyHeader( csv_file.readline() )
\ No newline at end of file
@@ -0,0 +1,123 @@
+import csv
+import itertools
+import operator
+from datetime import datetime
+from typing import List, TextIO
+import numpy as np
+from bank      import BankType
+from currency  import USD, ParseCents
+from statement import Statement, Transaction, Categorizer
+from transaction_table import TransactionTable, g_IsDebtFlag
+
+g_ChunkRows    = 65536
+g_EpochOrdinal = datetime( 1970, 1, 1 ).toordinal()
+g_MaxDigits    = 15 # dollar digits that still fit in int64 cents
+
+#------------------------------------------------------------------------------------------------
+# a numpy column as bytes in the layout of one of a TransactionTable's arrays
+def ColumnBytes( values : np.ndarray, column ) -> bytes:
+  return values.astype( np.dtype( column.typecode ) ).tobytes()
+
+#------------------------------------------------------------------------------------------------
+# ParseCents over a whole array of strings. Plain amounts (an optional '-', digits, then optionally
+#  '.' and one or two more digits) are parsed a character position at a time across all of the
+#  strings at once, anything else (dollar signs, parentheses, commas, spaces...) goes through
+#  ParseCents itself
+def ParseCentsColumn( strings : np.ndarray ) -> np.ndarray:
+  count = len( strings )
+  width = strings.dtype.itemsize // 4
+  cents = np.zeros( count, dtype=np.int64 )
+  if count == 0 or width == 0:
+    return cents
+
+  codes    = np.ascontiguousarray( strings ).view( np.uint32 ).reshape( count, width )
+  digits   = ( codes >= ord( '0' ) ) & ( codes <= ord( '9' ) )
+  dots     = codes == ord( '.' )
+  padding  = codes == 0
+  negative = codes[ :, 0 ] == ord( '-' )
+  has_dot  = dots.any( axis=1 )
+  length   = width - padding.sum( axis=1 )
+  sign_len = negative.astype( np.int64 )
+  int_end  = np.where( has_dot, dots.argmax( axis=1 ), length )
+  frac_len = np.where( has_dot, length - int_end - 1, 0 )
+
+  allowed        = digits | dots | padding
+  allowed[ :, 0 ] |= negative
+  plain = allowed.all( axis=1 ) & ( padding[ :, :-1 ] <= padding[ :, 1: ] ).all( axis=1 ) & ( dots.sum( axis=1 ) <= 1 ) \
+        & ( int_end - sign_len >= 1 ) & ( int_end - sign_len <= g_MaxDigits ) & ( ~has_dot | ( frac_len == 1 ) | ( frac_len == 2 ) )
+
+  dollars = np.zeros( count, dtype=np.int64 )
+  frac    = np.zeros( count, dtype=np.int64 )
+  for col in range( width ):
+    digit   = np.where( digits[ :, col ], codes[ :, col ].astype( np.int64 ) - ord( '0' ), 0 )
+    dollars = np.where( ( col >= sign_len ) & ( col < int_end ), dollars * 10 + digit, dollars )
+    frac    = np.where( has_dot & ( col > int_end ) & ( col < length ), frac * 10 + digit, frac )
+  amounts = dollars * 100 + np.where( frac_len == 1, frac * 10, frac )
+
+  # plain amounts are written negative when incoming, see ParseCents
+  cents[ plain ] = np.where( negative, amounts, -amounts )[ plain ]
+  for idx in np.flatnonzero( ~plain ).tolist():
+    cents[ idx ] = ParseCents( strings[ idx ] )
+  return cents
+
+#------------------------------------------------------------------------------------------------
+# Reads the rest of statement_file into the statement `chunk_rows` rows at a time. The csv is still
+#  split into fields by csv.reader, but everything after that is done per column: np.unique finds
+#  the distinct amounts, dates and descriptions in the chunk, amounts are parsed together (see
+#  ParseCentsColumn), dates parsed and descriptions categorized once each, and the inverse indices
+#  spread the results back over the rows. Start and end dates are reductions over the chunk's
+#  distinct dates as datetime64. Columnar statements get whole columns appended to their
+#  TransactionTable without any per-row objects.
+# The transactions come out the same as Statement.IterRows would make them
+def ReadRowsBatched( statement : Statement, statement_file : TextIO, categorizer : Categorizer, chunk_rows : int = g_ChunkRows ) -> None:
+  bank_info = statement.bank_info
+  columns   = operator.itemgetter( bank_info.amount_idx, bank_info.date_idx, bank_info.name_idx )
+  reader    = csv.reader( statement_file )
+  while True:
+    rows = list( itertools.islice( reader, chunk_rows ) )
+    if len( rows ) == 0:
+      break
+    amount_strs, date_strs, names = zip( *map( columns, rows ) )
+    ReadChunk( statement, categorizer, amount_strs, date_strs, names )
+
+def ReadChunk( statement : Statement, categorizer : Categorizer, amount_strs, date_strs, names ) -> None:
+  unique_amounts, amount_idxs = np.unique( np.array( amount_strs ), return_inverse=True )
+  unique_dates,   date_idxs   = np.unique( np.array( date_strs ),   return_inverse=True )
+  unique_names,   name_idxs   = np.unique( np.array( names ),       return_inverse=True )
+
+  date_parser = statement.bank_info.date_parser
+  dates       = [ date_parser( date_str ) for date_str in unique_dates.tolist() ]
+  dates64     = np.array( dates, dtype='datetime64[us]' )
+  start_date  = dates64.min().item()
+  end_date    = dates64.max().item()
+  if statement.start_date is None or statement.start_date > start_date:
+    statement.start_date = start_date
+  if statement.end_date is None or statement.end_date < end_date:
+    statement.end_date = end_date
+
+  name_strs  = unique_names.tolist()
+  categories = [ categorizer.GetCategoryForName( name ) for name in name_strs ]
+  is_credit  = statement.account.bank_info.type == BankType.CreditCard
+  is_debts   = [ is_credit or category == 'Loans' for category in categories ]
+
+  table = statement.transactions
+  if isinstance( table, TransactionTable ):
+    cents        = ParseCentsColumn( unique_amounts )[ amount_idxs ]
+    ordinals     = ( dates64.astype( 'datetime64[D]' ).astype( np.int64 ) + g_EpochOrdinal )[ date_idxs ]
+    name_ids     = np.array( [ table.StringId( name ) for name in name_strs ], dtype=np.int64 )[ name_idxs ]
+    category_ids = np.array( [ table.StringId( category ) for category in categories ], dtype=np.int64 )[ name_idxs ]
+    account_ids  = np.full( len( name_idxs ), table.AccountId( statement.account ), dtype=np.int64 )
+    flags        = np.where( np.array( is_debts )[ name_idxs ], g_IsDebtFlag, 0 )
+    table.ExtendColumns( ColumnBytes( cents,        table.cents ),
+                         ColumnBytes( ordinals,     table.dates ),
+                         ColumnBytes( name_ids,     table.name_ids ),
+                         ColumnBytes( category_ids, table.category_ids ),
+                         ColumnBytes( account_ids,  table.account_ids ),
+                         flags.astype( np.uint8 ).tobytes() )
+    return
+
+  amounts = [ USD( amount_cents ) for amount_cents in ParseCentsColumn( unique_amounts ).tolist() ]
+  account = statement.account
+  transactions : List[ Transaction ] = table
+  for amount_idx, date_idx, name_idx in zip( amount_idxs.tolist(), date_idxs.tolist(), name_idxs.tolist() ):
+    transactions.append( Transaction( name_strs[ name_idx ], amounts[ amount_idx ], account, dates[ date_idx ], categories[ name_idx ], is_debts[ name_idx ] ) )
\ No newline at end of file
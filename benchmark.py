@@ -0,0 +1,489 @@
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import string
+import tempfile
+import time
+import tracemalloc
+import yaml
+import openpyxl
+from datetime import datetime, timedelta
+from typing import List, Dict, Callable, Optional, Tuple
+from bank      import Bank, BankManager
+from currency  import USD
+from statement import Categorizer, Statement, Transaction, ResolveTransfers
+from transaction_table import TransactionTable
+from workbook_maker import WorkbookMaker, ExcelCell, ExcelCursor
+from prefetch import StatementPrefetcher, ReadFileBytes
+from statement_reader import ReadStatementFile, ReadStatements
+from statement_watcher import StatementWatcher
+
+g_ScriptDir      = os.path.dirname( os.path.abspath( __file__ ) )
+g_BankConfigPath = os.path.join( g_ScriptDir, 'bank_config.yaml' )
+g_Benchmarks     = [ 'categorizer', 'transaction-table', 'transaction-memory', 'stages', 'prefetch', 'batch-parse', 'cursor', 'watch' ]
+
+#------------------------------------------------------------------------------------------------
+def RandomWord( rng : random.Random, min_len : int = 4, max_len : int = 12 ) -> str:
+  return ''.join( rng.choice( string.ascii_uppercase ) for _ in range( rng.randint( min_len, max_len ) ) )
+
+#------------------------------------------------------------------------------------------------
+# a category config with `rule_count` rules spread over `category_count` categories.
+#  most rules are plain merchant names like the real config, a few are regexes
+def MakeCategoryConfig( rng : random.Random, rule_count : int, category_count : int = 30, regex_ratio : float = 0.05 ) -> Dict[ str, List[str] ]:
+  config : Dict[ str, List[str] ] = { f'Category {i}' : [] for i in range( category_count ) }
+  categories = list( config.keys() )
+  for _ in range( rule_count ):
+    merchant = f'{RandomWord( rng )} {RandomWord( rng, 2, 6 )}'
+    if rng.random() < regex_ratio:
+      merchant = f'{re.escape( RandomWord( rng ) )}.*{re.escape( RandomWord( rng, 2, 4 ) )}'
+    else:
+      merchant = re.escape( merchant )
+    config[ rng.choice( categories ) ].append( merchant )
+  return config
+
+#------------------------------------------------------------------------------------------------
+def MakeTransactionNames( rng : random.Random, config : Dict[ str, List[str] ], count : int, hit_ratio : float = 0.8 ) -> List[str]:
+  literals = [ re.sub( r'\\(.)', r'\1', p ) for patterns in config.values() for p in patterns if '.*' not in p ]
+  names : List[str] = []
+  for _ in range( count ):
+    if rng.random() < hit_ratio and len( literals ) > 0:
+      names.append( f'POS DEBIT {rng.choice( literals )} {rng.randint( 1000, 9999 )} RALEIGH NC' )
+    else:
+      names.append( f'POS DEBIT {RandomWord( rng )} {rng.randint( 1000, 9999 )} DURHAM NC' )
+  return names
+
+#------------------------------------------------------------------------------------------------
+def WriteYaml( config : Dict, directory : str, filename : str ) -> str:
+  path = os.path.join( directory, filename )
+  with open( path, 'w' ) as config_file:
+    yaml.safe_dump( config, config_file )
+  return path
+
+#------------------------------------------------------------------------------------------------
+def TimePerCall( fn : Callable[ [str], str ], names : List[str] ) -> float:
+  begin = time.perf_counter()
+  for name in names:
+    fn( name )
+  return ( time.perf_counter() - begin ) / len( names )
+
+#------------------------------------------------------------------------------------------------
+# per-transaction categorization cost, rule by rule (how it used to work) against the combined matcher
+def BenchCategorizer( rule_counts : List[int], tx_count : int, seed : int ) -> None:
+  print( f'{"rules":>8} {"sequential us/tx":>18} {"combined us/tx":>16} {"speedup":>8}' )
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    for rule_count in rule_counts:
+      rng         = random.Random( seed )
+      config      = MakeCategoryConfig( rng, rule_count )
+      names       = MakeTransactionNames( rng, config, tx_count )
+      categorizer = Categorizer( WriteYaml( config, tmp_dir, f'category_config_{rule_count}.yaml' ) )
+
+      def Sequential( name : str ) -> str:
+        for cat, patterns in categorizer.categories.items():
+          for pattern in patterns:
+            if re.search( pattern, name ) is not None:
+              return cat
+        return 'Unknown'
+
+      for name in names:
+        assert Sequential( name ) == categorizer.GetCategoryForName( name ), name
+
+      sequential_us = TimePerCall( Sequential, names ) * 1e6
+      combined_us   = TimePerCall( categorizer.GetCategoryForName, names ) * 1e6
+      print( f'{rule_count:>8} {sequential_us:>18.2f} {combined_us:>16.2f} {sequential_us / combined_us:>7.1f}x' )
+
+#------------------------------------------------------------------------------------------------
+# statements built in memory, one per bank, with tx_count transactions spread across them
+def MakeStatements( rng : random.Random, bank_manager : BankManager, tx_count : int ) -> List[ Statement ]:
+  categories = [ 'Food Groceries', 'Utilities', 'Transfer', 'Credit Card Payment', 'Unknown' ]
+  merchants  = [ f'POS DEBIT {RandomWord( rng )}' for _ in range( 500 ) ]
+  statements = [ Statement( bank_manager.banks[ bank ] ) for bank in Bank ]
+  first_date = datetime( 2023, 1, 1 )
+  for i in range( tx_count ):
+    statement = statements[ i % len( statements ) ]
+    date      = first_date + timedelta( days=rng.randint( 0, 364 ) )
+    category  = rng.choice( categories )
+    statement.transactions.append( Transaction( rng.choice( merchants ), USD( rng.randint( -50000, 50000 ) ), statement.account, date, category, False ) )
+  for statement in statements:
+    statement.start_date = min( tx.date for tx in statement.transactions )
+    statement.end_date   = max( tx.date for tx in statement.transactions )
+  return statements
+
+#------------------------------------------------------------------------------------------------
+def MakeBlankWorkbook( directory : str ) -> str:
+  path = os.path.join( directory, 'Finances.xlsx' )
+  openpyxl.Workbook().save( path )
+  return path
+
+#------------------------------------------------------------------------------------------------
+# cells/sec writing the transaction table cell by cell through ExcelCursor against row by row
+def BenchTransactionTable( tx_count : int, seed : int ) -> None:
+  statements = MakeStatements( random.Random( seed ), BankManager( g_BankConfigPath ), tx_count )
+  cell_count = ( tx_count + 2 ) * 8
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    workbook_path = MakeBlankWorkbook( tmp_dir )
+    sheets = {}
+    print( f'{"mode":>8} {"seconds":>10} {"cells/sec":>12}' )
+    for fast_write in [ False, True ]:
+      book_maker = WorkbookMaker( workbook_path, fast_write=fast_write )
+      sheet      = book_maker.workbook.create_sheet( 'bench' )
+      begin      = time.perf_counter()
+      book_maker.MakeTransactionTable( 'bench_tx', ExcelCell( 1, 1 ), sheet, statements )
+      seconds    = time.perf_counter() - begin
+      sheets[ fast_write ] = sheet
+      print( f'{"rows" if fast_write else "cursor":>8} {seconds:>10.3f} {cell_count / seconds:>12.0f}' )
+
+    slow_values = [ [ ( cell.value, cell.number_format ) for cell in row ] for row in sheets[ False ].iter_rows() ]
+    fast_values = [ [ ( cell.value, cell.number_format ) for cell in row ] for row in sheets[ True  ].iter_rows() ]
+    assert slow_values == fast_values
+    assert sheets[ False ].tables[ 'bench_tx' ].ref == sheets[ True ].tables[ 'bench_tx' ].ref
+
+#------------------------------------------------------------------------------------------------
+# cells/sec through the addressing layer alone: stepping an ExcelCursor, turning its cells into
+#  'A1' addresses, and writing through it into a sheet, over a table `width` columns wide
+def BenchCursor( cell_count : int, width : int = 8 ) -> None:
+  def StepCursor() -> None:
+    cursor = ExcelCursor( ExcelCell( 1, 1 ), width )
+    for _ in range( cell_count ):
+      cursor.inc()
+
+  def StepAddresses() -> None:
+    cursor = ExcelCursor( ExcelCell( 1, 1 ), width )
+    for _ in range( cell_count ):
+      str( cursor.inc() )
+
+  def WriteCells() -> None:
+    sheet  = openpyxl.Workbook().active
+    cursor = ExcelCursor( ExcelCell( 1, 1 ), width )
+    for _ in range( cell_count ):
+      cursor.Write( sheet, 1 )
+
+  print( f'{"step":>10} {"seconds":>10} {"cells/sec":>12}' )
+  for label, step in [ ( 'inc', StepCursor ), ( 'address', StepAddresses ), ( 'write', WriteCells ) ]:
+    begin   = time.perf_counter()
+    step()
+    seconds = time.perf_counter() - begin
+    print( f'{label:>10} {seconds:>10.3f} {cell_count / seconds:>12.0f}' )
+
+#------------------------------------------------------------------------------------------------
+def MeasureAllocated( build : Callable[ [], object ] ) -> int:
+  tracemalloc.start()
+  built = build()
+  allocated, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  del built
+  return allocated
+
+#------------------------------------------------------------------------------------------------
+# memory held by a statement's transactions as a list of Transactions against a TransactionTable
+def BenchTransactionMemory( tx_count : int, seed : int ) -> None:
+  statements = MakeStatements( random.Random( seed ), BankManager( g_BankConfigPath ), tx_count )
+  # keep the rows as plain tuples so neither measurement pays for the other's source objects
+  rows = [ ( tx.name, tx.amount.AsCents(), tx.account, tx.date.toordinal(), tx.category, tx.is_debt ) for stmt in statements for tx in stmt.transactions ]
+  del statements
+
+  def BuildList() -> List[ Transaction ]:
+    return [ Transaction( name, USD( cents ), account, datetime.fromordinal( date ), category, is_debt ) for name, cents, account, date, category, is_debt in rows ]
+
+  def BuildTable() -> TransactionTable:
+    table = TransactionTable()
+    for name, cents, account, date, category, is_debt in rows:
+      table.Append( name, USD( cents ), account, datetime.fromordinal( date ), category, is_debt )
+    return table
+
+  list_bytes  = MeasureAllocated( BuildList )
+  table_bytes = MeasureAllocated( BuildTable )
+  print( f'{"storage":>8} {"bytes":>12} {"bytes/tx":>10}' )
+  print( f'{"list":>8} {list_bytes:>12} {list_bytes / tx_count:>10.1f}' )
+  print( f'{"table":>8} {table_bytes:>12} {table_bytes / tx_count:>10.1f}' )
+
+#------------------------------------------------------------------------------------------------
+def FormatAmount( cents : int ) -> str:
+  return f'{"-" if cents < 0 else ""}{abs( cents ) // 100}.{abs( cents ) % 100:02d}'
+
+def WriteCsv( path : str, header : List[str], rows : List[ List[str] ] ) -> str:
+  with open( path, 'w', newline='' ) as csv_file:
+    writer = csv.writer( csv_file )
+    writer.writerow( header )
+    writer.writerows( rows )
+  return path
+
+#------------------------------------------------------------------------------------------------
+# statement files in the layout bank_config.yaml expects: one Truist checking export per account,
+#  a Discover statement and a PersonalLoan statement, with tx_count rows between them.
+#  transfer_ratio of the Truist rows are transfers between accounts or card payments, written on
+#  both sides so ResolveTransfers has pairs to find
+def WriteSyntheticStatements( rng : random.Random, directory : str, names : List[str], tx_count : int, account_count : int, transfer_ratio : float ) -> List[str]:
+  first_date = datetime( 2023, 1, 1 )
+  truist     : List[ List[ List[str] ] ] = [ [] for _ in range( account_count ) ]
+  discover   : List[ List[str] ] = []
+  loan       : List[ List[str] ] = []
+
+  def RandomDate() -> str:
+    return ( first_date + timedelta( days=rng.randint( 0, 360 ) ) ).strftime( '%m/%d/%Y' )
+
+  def TruistRow( date : str, name : str, cents : int ) -> List[str]:
+    return [ date, date, 'DEBIT' if cents > 0 else 'CREDIT', '', name, FormatAmount( cents ), '0.00' ]
+
+  row_count = 0
+  while row_count < tx_count:
+    cents = rng.randint( 100, 50000 )
+    roll  = rng.random()
+    if roll < transfer_ratio:
+      date = RandomDate()
+      if account_count > 1 and rng.random() < 0.5:
+        src, dst = rng.sample( range( account_count ), 2 )
+        truist[ src ].append( TruistRow( date, 'TRUIST ONLINE TRANSFER', cents ) )
+        truist[ dst ].append( TruistRow( date, 'TRUIST DEPOSIT TRANSFER', -cents ) )
+      else:
+        truist[ rng.randrange( account_count ) ].append( TruistRow( date, 'E-PAYMENT DISCOVER', cents ) )
+        discover.append( [ date, date, 'DIRECTPAY FULL BALANCE', FormatAmount( -cents ), 'Payments and Credits' ] )
+      row_count += 2
+    elif roll < 0.55:
+      truist[ rng.randrange( account_count ) ].append( TruistRow( RandomDate(), rng.choice( names ), cents ) )
+      row_count += 1
+    elif roll < 0.98:
+      date = RandomDate()
+      discover.append( [ date, date, rng.choice( names ), FormatAmount( cents ), 'Merchandise' ] )
+      row_count += 1
+    else:
+      loan.append( [ RandomDate(), 'LOAN PAYMENT', f'${FormatAmount( cents )}' ] )
+      row_count += 1
+
+  truist_header = [ 'Posted Date', 'Transaction Date', 'Transaction Type', 'Check/Serial #', 'Description', 'Amount', 'Daily Posted Balance' ]
+  paths = [ WriteCsv( os.path.join( directory, f'acct_{1000 + account_idx}_01_01_2023_to_12_31_2023.csv' ), truist_header, rows ) for account_idx, rows in enumerate( truist ) ]
+  paths.append( WriteCsv( os.path.join( directory, 'Discover-Statement-20231231.csv' ), [ 'Trans. Date', 'Post Date', 'Description', 'Amount', 'Category' ], discover ) )
+  paths.append( WriteCsv( os.path.join( directory, 'PersonalLoan-2023.csv' ), [ 'Date', 'Name', 'Amount' ], loan ) )
+  return paths
+
+#------------------------------------------------------------------------------------------------
+# stands in for the categorizer while reading, so reading and categorizing are timed separately
+class NoCategorizer:
+  def GetCategoryForName( self, name : str ) -> str:
+    return 'Unknown'
+
+#------------------------------------------------------------------------------------------------
+# wall time of each import stage, run in order over synthetic statements the way excel_importer
+#  does it. Returns the parameters and per-stage results, ready to dump as json
+def BenchStages( tx_count : int, rule_count : int, account_count : int, transfer_ratio : float, seed : int ) -> Dict:
+  rng    = random.Random( seed )
+  config = MakeCategoryConfig( rng, rule_count )
+  config[ 'Transfer' ]            = [ 'TRUIST ONLINE TRANSFER', 'TRUIST DEPOSIT TRANSFER' ]
+  config[ 'Credit Card Payment' ] = [ r'E\-PAYMENT DISCOVER', 'DIRECTPAY FULL BALANCE' ]
+  config[ 'Loans' ]               = [ 'LOAN PAYMENT' ]
+  names  = MakeTransactionNames( rng, config, max( tx_count // 10, 1 ) )
+
+  stages : Dict[ str, Dict ] = {}
+  def Stage( name : str, rows : int, fn : Callable[ [], object ] ) -> object:
+    begin  = time.perf_counter()
+    result = fn()
+    stages[ name ] = { 'seconds' : time.perf_counter() - begin, 'rows' : rows }
+    return result
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    paths        = WriteSyntheticStatements( rng, tmp_dir, names, tx_count, account_count, transfer_ratio )
+    category_cfg = WriteYaml( config, tmp_dir, 'category_config.yaml' )
+    bank_manager = Stage( 'load_bank_config',     0, lambda : BankManager( g_BankConfigPath ) )
+    categorizer  = Stage( 'load_category_config', 0, lambda : Categorizer( category_cfg ) )
+    bank_infos   = Stage( 'identify_statement', len( paths ), lambda : [ bank_manager.IdentifyStatement( path ) for path in paths ] )
+
+    def ReadAll() -> List[ Statement ]:
+      statements = []
+      for path, bank_info in zip( paths, bank_infos ):
+        statement = Statement( bank_info )
+        statement.Read( path, NoCategorizer() )
+        statements.append( statement )
+      return statements
+    statements = Stage( 'read', tx_count, ReadAll )
+    all_tx     = [ tx for stmt in statements for tx in stmt.transactions ]
+
+    def CategorizeAll() -> None:
+      for tx in all_tx:
+        tx.category = categorizer.GetCategoryForName( tx.name )
+        tx.is_debt  = tx.is_debt or tx.category == 'Loans'
+    Stage( 'categorize', len( all_tx ), CategorizeAll )
+    Stage( 'resolve_transfers', len( all_tx ), lambda : ResolveTransfers( statements ) )
+
+    book_maker = WorkbookMaker( MakeBlankWorkbook( tmp_dir ) )
+    sheet      = book_maker.CreatePeriodSheet( 'bench' )
+    end_cell   = Stage( 'summary_table', len( all_tx ), lambda : book_maker.MakeSummaryTable( 'bench_summary', ExcelCell( 1, 1 ), sheet, 'bench_tx', statements, categorizer ) )
+    end_cell.col += 2
+    end_cell.row  = 1
+    Stage( 'transaction_table', len( all_tx ), lambda : book_maker.MakeTransactionTable( 'bench_tx', end_cell, sheet, statements ) )
+    Stage( 'save', len( all_tx ), book_maker.Save )
+
+  return { 'transactions'   : len( all_tx ),
+           'rules'          : rule_count,
+           'accounts'       : account_count,
+           'transfer_ratio' : transfer_ratio,
+           'seed'           : seed,
+           'stages'         : stages }
+
+def PrintStages( results : Dict, baseline : Optional[ Dict ] = None ) -> None:
+  print( f'{"stage":>22} {"seconds":>10} {"rows/sec":>12}{"   vs baseline" if baseline is not None else ""}' )
+  for name, stage in results[ 'stages' ].items():
+    rate = f'{stage[ "rows" ] / stage[ "seconds" ]:>12.0f}' if stage[ 'rows' ] > 0 and stage[ 'seconds' ] > 0 else f'{"":>12}'
+    line = f'{name:>22} {stage[ "seconds" ]:>10.4f} {rate}'
+    if baseline is not None and name in baseline[ 'stages' ] and baseline[ 'stages' ][ name ][ 'seconds' ] > 0:
+      line += f' {stage[ "seconds" ] / baseline[ "stages" ][ name ][ "seconds" ]:>13.2f}x'
+    print( line )
+
+#------------------------------------------------------------------------------------------------
+# a file reader that takes `latency` seconds longer, like opening a file on a slow share
+def DelayedReader( latency : float ) -> Callable[ [str], bytes ]:
+  def Read( path : str ) -> bytes:
+    time.sleep( latency )
+    return ReadFileBytes( path )
+  return Read
+
+# reading and parsing statement files one after another against prefetching them on threads,
+#  with every file read taking an extra `latency` seconds
+def BenchPrefetch( tx_count : int, account_count : int, latency : float, concurrency_levels : List[int], seed : int ) -> None:
+  rng          = random.Random( seed )
+  config       = MakeCategoryConfig( rng, 250 )
+  names        = MakeTransactionNames( rng, config, max( tx_count // 10, 1 ) )
+  bank_manager = BankManager( g_BankConfigPath )
+  reader       = DelayedReader( latency )
+
+  def Rows( statements : List[ Statement ] ) -> List:
+    return [ ( str( stmt.account ), tx.date, tx.amount.AsCents(), tx.name, tx.category ) for stmt in statements for tx in stmt.transactions ]
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    paths       = WriteSyntheticStatements( rng, tmp_dir, names, tx_count, account_count, 0.1 )
+    categorizer = Categorizer( WriteYaml( config, tmp_dir, 'category_config.yaml' ) )
+
+    print( f'{len( paths )} files, {latency * 1000:.0f}ms latency each' )
+    print( f'{"prefetch":>8} {"seconds":>10} {"speedup":>8}' )
+    begin    = time.perf_counter()
+    serial   = [ ReadStatementFile( path, bank_manager, categorizer, contents=reader( path ) ) for path in paths ]
+    serial_s = time.perf_counter() - begin
+    print( f'{"off":>8} {serial_s:>10.3f} {1:>7.1f}x' )
+
+    for concurrency in concurrency_levels:
+      begin      = time.perf_counter()
+      prefetched = [ ReadStatementFile( path, bank_manager, categorizer, contents=contents ) for path, contents in StatementPrefetcher( paths, concurrency, reader ) ]
+      seconds    = time.perf_counter() - begin
+      assert Rows( prefetched ) == Rows( serial )
+      print( f'{concurrency:>8} {seconds:>10.3f} {serial_s / seconds:>7.1f}x' )
+
+#------------------------------------------------------------------------------------------------
+# parsing statements a row at a time against batch_reader's NumPy chunks, for both kinds of
+#  statement, checking the transactions come out the same
+def BenchBatchParse( tx_count : int, seed : int ) -> None:
+  rng          = random.Random( seed )
+  config       = MakeCategoryConfig( rng, 250 )
+  names        = MakeTransactionNames( rng, config, max( tx_count // 10, 1 ) )
+  bank_manager = BankManager( g_BankConfigPath )
+
+  def Rows( statements : List[ Statement ] ) -> List:
+    return [ ( str( stmt.account ), stmt.start_date, stmt.end_date ) for stmt in statements ] + \
+           [ ( str( tx.account ), tx.date, tx.amount.AsCents(), tx.name, tx.category, tx.is_debt ) for stmt in statements for tx in stmt.transactions ]
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    paths       = WriteSyntheticStatements( rng, tmp_dir, names, tx_count, 2, 0.1 )
+    category_cfg = WriteYaml( config, tmp_dir, 'category_config.yaml' )
+
+    print( f'{tx_count} rows in {len( paths )} files' )
+    print( f'{"statements":>10} {"row s":>10} {"batch s":>10} {"speedup":>8}' )
+    for columnar in [ False, True ]:
+      seconds = []
+      results = []
+      for batch in [ False, True ]:
+        categorizer = Categorizer( category_cfg ) # fresh, so neither run gets the other's lookups
+        begin       = time.perf_counter()
+        results.append( [ ReadStatementFile( path, bank_manager, categorizer, columnar, batch=batch ) for path in paths ] )
+        seconds.append( time.perf_counter() - begin )
+      assert Rows( results[0] ) == Rows( results[1] )
+      print( f'{"columnar" if columnar else "list":>10} {seconds[0]:>10.3f} {seconds[1]:>10.3f} {seconds[0] / seconds[1]:>7.1f}x' )
+
+#------------------------------------------------------------------------------------------------
+# a plain import against StatementWatcher's first one, then one statement arriving while it
+#  watches against importing everything again. The watcher's transfers have to come out matched
+#  the same as the plain import's both times. Its first import also writes the workbook
+def BenchWatch( tx_count : int, account_count : int, transfer_ratio : float, seed : int ) -> None:
+  rng    = random.Random( seed )
+  config = MakeCategoryConfig( rng, 250 )
+  config[ 'Transfer' ]            = [ 'TRUIST ONLINE TRANSFER', 'TRUIST DEPOSIT TRANSFER' ]
+  config[ 'Credit Card Payment' ] = [ r'E\-PAYMENT DISCOVER', 'DIRECTPAY FULL BALANCE' ]
+  names  = MakeTransactionNames( rng, config, max( tx_count // 10, 1 ) )
+  bank_manager = BankManager( g_BankConfigPath )
+
+  def Rows( statements : List[ Statement ] ) -> List:
+    return sorted( ( str( tx.account ), tx.date, tx.amount.AsCents(), tx.name, tx.category, tx.matched_transfer ) for stmt in statements for tx in stmt.transactions )
+
+  def Time( fn : Callable[ [], object ] ) -> Tuple[ object, float ]:
+    begin  = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - begin
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    statements_dir = os.path.join( tmp_dir, 'statements' )
+    os.makedirs( statements_dir )
+    paths       = WriteSyntheticStatements( rng, statements_dir, names, tx_count, account_count, transfer_ratio )
+    categorizer = Categorizer( WriteYaml( config, tmp_dir, 'category_config.yaml' ) )
+
+    # one checking account's statement turns up once the watcher is running
+    held_path = os.path.join( tmp_dir, os.path.basename( paths[0] ) )
+    os.replace( paths[0], held_path )
+
+    plain, import_s = Time( lambda : ReadStatements( statements_dir, bank_manager, categorizer ) )
+    watcher         = StatementWatcher( statements_dir, bank_manager, categorizer, WorkbookMaker( MakeBlankWorkbook( tmp_dir ) ) )
+    _, start_s      = Time( watcher.Start )
+    assert Rows( watcher.output ) == Rows( plain )
+
+    os.replace( held_path, paths[0] )
+    watcher.Poll() # files are only read once they've looked the same on two polls
+    _, poll_s        = Time( watcher.Poll )
+    full, reimport_s = Time( lambda : ReadStatements( statements_dir, bank_manager, categorizer ) )
+    assert Rows( watcher.output ) == Rows( full )
+
+    print( f'{"step":>12} {"seconds":>10}' )
+    for label, seconds in [ ( 'import', import_s ), ( 'watch start', start_s ), ( 'reimport', reimport_s ), ( 'watch poll', poll_s ) ]:
+      print( f'{label:>12} {seconds:>10.3f}' )
+
+#------------------------------------------------------------------------------------------------
+if __name__=='__main__':
+  def ParseArgs():
+    parser = argparse.ArgumentParser()
+    parser.add_argument( '--rules', type=int, nargs='+', default=[ 10, 50, 100, 250, 500, 1000 ], help='Rule counts to benchmark the categorizer with' )
+    parser.add_argument( '--transactions', type=int, default=5000, help='Number of transactions per benchmark' )
+    parser.add_argument( '--bench', choices=g_Benchmarks, nargs='+', default=g_Benchmarks, help='Which benchmarks to run' )
+    parser.add_argument( '--seed', type=int, default=1234, help='Seed for the synthetic config and transactions' )
+    parser.add_argument( '--accounts', type=int, default=2, help='Number of checking accounts in the synthetic statements' )
+    parser.add_argument( '--transfer-ratio', type=float, default=0.1, help='Share of synthetic rows that are transfers between accounts' )
+    parser.add_argument( '--json', type=str, default=None, help='Write the stage timings to this json file' )
+    parser.add_argument( '--latency', type=float, default=0.05, help='Seconds added to every file read in the prefetch benchmark' )
+    parser.add_argument( '--prefetch', type=int, nargs='+', default=[ 2, 4, 8 ], help='Prefetch concurrency levels to benchmark' )
+    parser.add_argument( '--batch-rows', type=int, default=100000, help='Number of rows in the batch parse benchmark' )
+    parser.add_argument( '--cells', type=int, default=1000000, help='Number of cells stepped through in the cursor benchmark' )
+    parser.add_argument( '--baseline', type=str, default=None, help='Stage timings json from an earlier run to compare against' )
+    return parser.parse_args()
+  args = ParseArgs()
+
+  if 'categorizer' in args.bench:
+    BenchCategorizer( args.rules, args.transactions, args.seed )
+  if 'transaction-table' in args.bench:
+    BenchTransactionTable( args.transactions, args.seed )
+  if 'transaction-memory' in args.bench:
+    BenchTransactionMemory( args.transactions, args.seed )
+  if 'stages' in args.bench:
+    results = BenchStages( args.transactions, max( args.rules ), args.accounts, args.transfer_ratio, args.seed )
+    baseline = None
+    if args.baseline is not None:
+      with open( args.baseline, 'r' ) as baseline_file:
+        baseline = json.load( baseline_file )
+    PrintStages( results, baseline )
+    if args.json is not None:
+      with open( args.json, 'w' ) as json_file:
+        json.dump( results, json_file, indent=2 )
+  if 'prefetch' in args.bench:
+    BenchPrefetch( args.transactions, args.accounts, args.latency, args.prefetch, args.seed )
+  if 'batch-parse' in args.bench:
+    BenchBatchParse( args.batch_rows, args.seed )
+  if 'cursor' in args.bench:
+    BenchCursor( args.cells )
+  if 'watch' in args.bench:
+    BenchWatch( args.transactions, args.accounts, args.transfer_ratio, args.seed )
\ No newline at end of file
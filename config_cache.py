@@ -0,0 +1,77 @@
+import os
+import pickle
+from typing import Optional, List, Dict, Tuple
+from bank      import BankManager
+from manifest  import HashFile
+from statement import Categorizer
+
+g_ConfigCacheVersion = 1
+
+#------------------------------------------------------------------------------------------------
+# size, mtime and content hash of each config file the cached config was built from
+def StampFiles( paths : List[str] ) -> Dict[ str, Tuple[ int, int, str ] ]:
+  stamps = {}
+  for path in paths:
+    stat = os.stat( path )
+    stamps[ path ] = ( stat.st_size, stat.st_mtime_ns, HashFile( path ) )
+  return stamps
+
+# the stamps still describe the files if size and mtime match, or failing that the content hash.
+#  Returns whether the stamps match, and whether any were refreshed along the way
+def CheckStamps( stamps : Dict[ str, Tuple[ int, int, str ] ], paths : List[str] ) -> Tuple[ bool, bool ]:
+  if sorted( stamps.keys() ) != sorted( paths ):
+    return False, False
+
+  refreshed = False
+  for path in paths:
+    size, mtime_ns, content_hash = stamps[ path ]
+    stat = os.stat( path )
+    if stat.st_size == size and stat.st_mtime_ns == mtime_ns:
+      continue
+    if stat.st_size != size or HashFile( path ) != content_hash:
+      return False, False
+    stamps[ path ] = ( size, stat.st_mtime_ns, content_hash )
+    refreshed = True
+  return True, refreshed
+
+#------------------------------------------------------------------------------------------------
+def ReadConfigCache( cache_path : str ) -> Optional[ Dict ]:
+  if not os.path.isfile( cache_path ):
+    return None
+  try:
+    with open( cache_path, 'rb' ) as cache_file:
+      cache = pickle.load( cache_file )
+  except ( OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError ):
+    return None
+  if not isinstance( cache, dict ) or cache.get( 'version' ) != g_ConfigCacheVersion:
+    return None
+  return cache
+
+def WriteConfigCache( cache_path : str, cache : Dict ) -> None:
+  with open( cache_path, 'wb' ) as cache_file:
+    pickle.dump( cache, cache_file )
+
+#------------------------------------------------------------------------------------------------
+# The bank and category config, parsed and compiled, loaded from cache_path if it was built from
+#  the same yaml files. Otherwise they're built from yaml and cached for next time. The category
+#  cache file isn't part of this, point the categorizer at it with Categorizer.UseCacheFile
+def LoadConfigs( bank_config_path : str, category_config_path : str, cache_path : str ) -> Tuple[ BankManager, Categorizer ]:
+  config_paths = [ bank_config_path, category_config_path ]
+
+  cache = ReadConfigCache( cache_path )
+  if cache is not None:
+    matches, refreshed = CheckStamps( cache[ 'stamps' ], config_paths )
+    if matches:
+      if refreshed:
+        WriteConfigCache( cache_path, cache )
+      return cache[ 'bank_manager' ], cache[ 'categorizer' ]
+
+  # stamped before reading, so a config edited meanwhile doesn't look cached
+  stamps       = StampFiles( config_paths )
+  bank_manager = BankManager( bank_config_path )
+  categorizer  = Categorizer( category_config_path )
+  WriteConfigCache( cache_path, { 'version'      : g_ConfigCacheVersion,
+                                  'stamps'       : stamps,
+                                  'bank_manager' : bank_manager,
+                                  'categorizer'  : categorizer } )
+  return bank_manager, categorizer
\ No newline at end of file
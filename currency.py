@@ -1,58 +1,100 @@
-import math
-import re
+import functools
 
+#------------------------------------------------------------------------------------------------
+# Parses an amount from a statement into signed cents, positive when incoming. Statements write
+#  amounts in one of two ways:
+#   -12.34    subtle: the sign flips here. cash is represented as negative for income in csv,
+#             internally negative means spent
+#   ($12.34)  amounts with a dollar sign are incoming unless parenthesized (or negative)
+# Anything that isn't an amount parses as zero
+def ParseCents( string : str ) -> int:
+  text = string.strip()
+  if len( text ) == 0:
+    return 0
+
+  is_dollar_fmt = False
+  negative      = False
+  if text[0] == '(' and text[-1] == ')':
+    text          = text[ 1:-1 ]
+    is_dollar_fmt = True
+    negative      = True
+  if len( text ) > 0 and ( text[0] == '-' or text[0] == '+' ):
+    negative = negative or text[0] == '-'
+    text     = text[ 1: ]
+  if len( text ) > 0 and text[0] == '$':
+    text          = text[ 1: ]
+    is_dollar_fmt = True
+
+  dollar_text, _, cents_text = text.replace( ',', '' ).partition( '.' )
+  if not ( dollar_text.isdigit() or ( dollar_text == '' and cents_text.isdigit() ) ):
+    return 0
+  if cents_text != '' and not cents_text.isdigit():
+    return 0
+
+  cents = int( dollar_text or '0' ) * 100 + int( ( cents_text[ :2 ] + '00' )[ :2 ] )
+  if is_dollar_fmt:
+    return -cents if negative else cents
+  return cents if negative else -cents
+
+#------------------------------------------------------------------------------------------------
+@functools.total_ordering
 class USD:
-  dollar_amt : int
-  cents_amt  : int
-  incoming   : bool
+  __slots__ = ( 'cents', )
 
-  def __init__( self, dollar_amt : int, cents_amt : int, incoming : bool ) -> None:
-    self.dollar_amt = dollar_amt
-    self.cents_amt  = cents_amt
-    self.incoming   = incoming
+  cents : int # signed, positive when incoming
 
+  def __init__( self, cents : int = 0 ) -> None:
+    self.cents = cents
+
+  @staticmethod
   def FromString( string : str ):
-    new_usd = USD(0,0,False)
-    if re.match( r'\-?\d+\.\d+', string ) is not None:
-      amount_text = string.split('.')
-      
-      #subtle: we're flipping the sign here.
-      # cash is represented as negative for income in csv
-      # internally, negative means spent
-      new_usd.dollar_amt = abs(int(amount_text[0]))
-      new_usd.cents_amt  =     int(amount_text[1])
-      new_usd.incoming   = math.copysign( 1, int(amount_text[0]) ) == -1
-
-    elif re.match( r'\(?\$(\d+)\.?(\d+)?\)?', string ) is not None:
-      m = re.match( r'\(?\$(\d+)\.?(\d+)?\)?', string )
-
-      new_usd.dollar_amt = int(m.group(1))
-      new_usd.cents_amt  = int(m.group(2)) if m.group(2) is not None else 0
-      new_usd.incoming   = string.startswith( '(' ) == False
-    return new_usd
+    return USD( ParseCents( string ) )
+
+  @property
+  def dollar_amt( self ) -> int:
+    return abs( self.cents ) // 100
+
+  @property
+  def cents_amt( self ) -> int:
+    return abs( self.cents ) % 100
+
+  @property
+  def incoming( self ) -> bool:
+    return self.cents >= 0
 
   def __add__( self, usd ):
-    int_amt       = self.dollar_amt * 100 + self.cents_amt
-    int_other_amt = usd.dollar_amt * 100 + usd.cents_amt
-    if self.incoming == False:
-      int_amt *= -1
-    if usd.incoming == False:
-      int_other_amt *= -1
+    return USD( self.cents + usd.cents )
 
-    total_amt = int_amt + int_other_amt
-    
-    return USD( math.floor( abs( total_amt / 100 ) ), abs( total_amt % 100 ), math.copysign( 1, total_amt ) == 1 )
+  def __sub__( self, usd ):
+    return USD( self.cents - usd.cents )
+
+  def __neg__( self ):
+    return USD( -self.cents )
 
   def __repr__( self ) -> str:
     neg : str = '' if self.incoming else '-'
-    return f'{neg}${self.dollar_amt}.{self.cents_amt}'
-  
-  def __neg__( self ):
-    return USD( self.dollar_amt, self.cents_amt, not self.incoming )
-  
+    return f'{neg}${self.dollar_amt}.{self.cents_amt:02d}'
+
   def __eq__( self, other ):
-    return self.dollar_amt == other.dollar_amt and self.cents_amt == other.cents_amt and self.incoming == other.incoming
+    if not isinstance( other, USD ):
+      return NotImplemented
+    return self.cents == other.cents
+
+  def __lt__( self, other ):
+    if not isinstance( other, USD ):
+      return NotImplemented
+    return self.cents < other.cents
+
+  def __hash__( self ) -> int:
+    return hash( self.cents )
+
+  # signed amount in cents, positive when incoming
+  def AsCents( self ) -> int:
+    return self.cents
+
+  def AsFloat( self ) -> float:
+    return self.cents / 100
 
   def AsExcel( self ) -> str:
     neg : str = '' if self.incoming else '-'
-    return f'{neg}{self.dollar_amt}.{self.cents_amt}'
\ No newline at end of file
+    return f'{neg}{self.dollar_amt}.{self.cents_amt:02d}'
\ No newline at end of file
@@ -1,21 +1,23 @@
 import argparse
 import os
 import sys
-from colorama import Fore, Style
-import colorama
-import pdb
-from typing import Optional, List, Dict, Pattern
-from datetime import datetime
-from statement import Statement, Categorizer
-from bank      import Bank, BankInfo, BankManager
-from currency  import USD
-from workbook_maker import WorkbookMaker
+import profiling
+from datetime import datetime, timedelta
+from statement import Categorizer
+from bank      import BankManager
+from manifest  import StatementManifest
+from config_cache import LoadConfigs
+from statement_reader import ReadStatements
 
 
 g_WorkingDir         = '\\\\lore\home\\finances'
 g_WorkbookFile       = 'Finances.xlsx'
+g_ManifestFile       = 'Finances.manifest'
+g_StoreFile          = 'Finances.sqlite'
 g_BankConfigFile     = 'bank_config.yaml'
 g_CategoryConfigFile = 'category_config.yaml'
+g_CategoryCacheFile  = 'category_cache.pickle'
+g_ConfigCacheFile    = 'config_cache.pickle'
 
 sys.path.append( g_WorkingDir )
 
@@ -30,38 +32,130 @@ def type_dir_path( path : str ) -> str:
   else:
     raise NotAValidDirError(full_dir)
 
-
 #------------------------------------------------------------------------------------------------
-def ReadStatements( path_to_statements : str, bank_manager : BankManager, categorizer : Categorizer ) -> List[ Statement ]:
-  statements : List[ Statement ] = []
-  statement_file_list = os.listdir( path_to_statements )
-  for file in statement_file_list:
-    statement_full_path = f'{path_to_statements}\\{file}'
-    bank_info = bank_manager.IdentifyStatement( statement_full_path )
-    if bank_info is not None:
-      statement = Statement( bank_info )
-      statement.Read( statement_full_path, categorizer )
-      statements.append( statement )
-
-  for statement in statements:
-    statement.ResolveTransfers( statements )
-
-  return statements
+def type_date( date : str ) -> datetime:
+  return datetime.strptime( date, '%m/%d/%Y' )
 
 #------------------------------------------------------------------------------------------------
 if __name__=='__main__':
   def ParseArgs():
     parser = argparse.ArgumentParser()
-    parser.add_argument( '--statements', type=type_dir_path, required="True", help='Name of directory where statements are stored')
-    return parser.parse_args()
+    parser.add_argument( '--statements', type=type_dir_path, help='Name of directory where statements are stored')
+    parser.add_argument( '--transfer-window', type=int, default=None, help='Only match transfers whose dates are at most this many days apart' )
+    parser.add_argument( '--pair-transfers', action='store_true', help='Match each transfer with at most one opposite transfer' )
+    parser.add_argument( '--jobs', type=int, default=1, help='Number of processes used to read statements' )
+    parser.add_argument( '--prefetch', type=int, default=0, help='Read up to this many statement files ahead of the parser, on as many threads' )
+    parser.add_argument( '--incremental', action='store_true', help='Only parse statements that are new or modified since the last import' )
+    parser.add_argument( '--fast-write', action='store_true', help='Write the transaction table a row at a time' )
+    parser.add_argument( '--static-summary', action='store_true', help='Write summary totals as values instead of SUMIFS formulas' )
+    parser.add_argument( '--split-workbook', action='store_true', help=f'Save each period as its own workbook in a directory next to {g_WorkbookFile} instead of a sheet in it' )
+    parser.add_argument( '--period-months', type=int, default=None, help='Give every period of this many months (1 for months, 3 for quarters) its own sheet, listed on an index sheet. Periods are built on --jobs processes with --split-workbook' )
+    parser.add_argument( '--columnar', action='store_true', help='Keep transactions in compact columnar tables' )
+    parser.add_argument( '--batch', action='store_true', help='Parse statements a chunk of rows at a time with NumPy, which must be installed' )
+    parser.add_argument( '--category-cache', action='store_true', help='Remember categorized names between runs until category config changes' )
+    parser.add_argument( '--config-cache', action='store_true', help=f'Keep the parsed bank and category config in {g_ConfigCacheFile} until either yaml file changes' )
+    parser.add_argument( '--dedup', action='store_true', help='Drop transactions repeated across overlapping statements' )
+    parser.add_argument( '--store', action='store_true', help=f'Also save imported transactions to {g_StoreFile}' )
+    parser.add_argument( '--recategorize', action='store_true', help=f'Apply the current category config to the transactions already in {g_WorkbookFile} (and {g_StoreFile} with --store) instead of importing' )
+    parser.add_argument( '--watch', action='store_true', help='Keep running and import statements as they are added to or changed in --statements' )
+    parser.add_argument( '--poll-interval', type=float, default=2.0, help='Seconds between checks of the statements directory with --watch' )
+    parser.add_argument( '--debounce', type=float, default=5.0, help=f'Seconds without new statements before {g_WorkbookFile} is saved with --watch' )
+    parser.add_argument( '--timings', action='store_true', help='Print time, rows and peak memory for each stage of the import' )
+    parser.add_argument( '--timings-no-memory', action='store_true', help='Skip tracking peak memory with --timings, which slows the import down' )
+    parser.add_argument( '--profile', type=str, default=None, help='Write cProfile stats for the import to this file (implies --timings)' )
+    parser.add_argument( '--from-store', type=type_date, nargs=2, metavar=( 'START', 'END' ), help=f'Build the sheet for START to END (mm/dd/yyyy) from {g_StoreFile} instead of reading statements' )
+    args = parser.parse_args()
+    if args.statements is None and args.from_store is None and not args.recategorize:
+      parser.error( '--statements is required unless building a sheet --from-store or using --recategorize' )
+    if args.watch and args.from_store is not None:
+      parser.error( '--watch reads statements as they arrive, it can\'t be used with --from-store' )
+    if args.watch and args.period_months is not None:
+      parser.error( '--watch keeps everything on one sheet, it can\'t be used with --period-months' )
+    if args.period_months is not None and args.period_months < 1:
+      parser.error( '--period-months must be at least 1' )
+    if args.batch:
+      import importlib.util
+      if importlib.util.find_spec( 'numpy' ) is None:
+        parser.error( '--batch needs NumPy, install it with pip install numpy' )
+    return args
   args = ParseArgs()
 
-  colorama.init()
+  profiler = profiling.Enable( not args.timings_no_memory, args.profile is not None ) if args.timings or args.profile is not None else None
+
+  with profiling.Stage( 'load config' ):
+    bank_config_path     = f'{g_WorkingDir}\\{g_BankConfigFile}'
+    category_config_path = f'{g_WorkingDir}\\{g_CategoryConfigFile}'
+    category_cache       = f'{g_WorkingDir}\\{g_CategoryCacheFile}' if args.category_cache else None
+    if args.config_cache:
+      bank_manager, categorizer = LoadConfigs( bank_config_path, category_config_path, f'{g_WorkingDir}\\{g_ConfigCacheFile}' )
+      categorizer.UseCacheFile( category_cache )
+    else:
+      bank_manager = BankManager( bank_config_path )
+      categorizer  = Categorizer( category_config_path, cache_path=category_cache )
+
+  transfer_window = timedelta( days=args.transfer_window ) if args.transfer_window is not None else None
+  manifest        = StatementManifest( f'{g_WorkingDir}\\{g_ManifestFile}', bank_manager.config_hash + categorizer.config_hash ) if args.incremental and args.from_store is None and not args.recategorize else None
+  store           = None
+  if args.store or args.from_store is not None:
+    from transaction_store import TransactionStore
+    store = TransactionStore( f'{g_WorkingDir}\\{g_StoreFile}' )
+
+  workbook_path = f'{g_WorkingDir}\\{os.path.splitext( g_WorkbookFile )[0]}' if args.split_workbook else f'{g_WorkingDir}\\{g_WorkbookFile}'
+
+  if args.recategorize:
+    from recategorize import RecategorizeWorkbookFile, RecategorizeStore
+    with profiling.Stage( 'recategorize workbook' ):
+      RecategorizeWorkbookFile( workbook_path, args.split_workbook, bank_manager, categorizer, transfer_window, args.pair_transfers )
+    if store is not None:
+      with profiling.Stage( 'recategorize store' ):
+        RecategorizeStore( store, bank_manager, categorizer, transfer_window, args.pair_transfers )
+  elif args.watch:
+    from workbook_maker import WorkbookMaker
+    from statement_watcher import StatementWatcher
+    book_maker = WorkbookMaker( workbook_path, fast_write=args.fast_write, static_summary=args.static_summary, split_periods=args.split_workbook )
+    watcher    = StatementWatcher( args.statements, bank_manager, categorizer, book_maker, transfer_window, args.pair_transfers, args.columnar, args.dedup, manifest, store, args.batch )
+    watcher.Start( args.jobs )
+    watcher.Run( args.poll_interval, args.debounce )
+  else:
+    if args.from_store is not None:
+      with profiling.Stage( 'query store' ):
+        new_statements = store.QueryStatements( bank_manager, args.from_store[0], args.from_store[1], args.columnar )
+    else:
+      with profiling.Stage( 'read statements' ):
+        new_statements = ReadStatements( args.statements, bank_manager, categorizer, transfer_window, args.pair_transfers, args.jobs, manifest, args.columnar, args.dedup, args.prefetch, args.batch )
+      categorizer.SaveCache()
+      if store is not None and ( manifest is None or manifest.changed ):
+        with profiling.Stage( 'save store' ):
+          store.AddStatements( new_statements )
+
+    if manifest is not None and not manifest.changed:
+      print( f'No new or modified statements, {workbook_path} is up to date' )
+    else:
+      with profiling.Stage( 'load workbook' ):
+        from workbook_maker import WorkbookMaker
+        book_maker  = WorkbookMaker( workbook_path, fast_write=args.fast_write, static_summary=args.static_summary, split_periods=args.split_workbook )
+      with profiling.Stage( 'append statements' ):
+        if args.period_months is not None:
+          book_maker.AppendPeriods( new_statements, categorizer, args.period_months, args.jobs )
+        else:
+          book_maker.AppendStatements( new_statements, categorizer )
+      with profiling.Stage( 'save workbook' ):
+        book_maker.Save()
+
+  # only saved once the workbook is, so an import that fails halfway is redone next time
+  if manifest is not None:
+    manifest.Save()
+
+  if store is not None:
+    store.Close()
 
-  bank_manager   = BankManager( g_WorkingDir + '\\' + g_BankConfigFile )
-  categorizer    = Categorizer( f'{g_WorkingDir}\\{g_CategoryConfigFile}' )
-  new_statements = ReadStatements( args.statements, bank_manager, categorizer )
+  if args.category_cache:
+    stats = categorizer.CacheStats()
+    print( f'Category cache: {stats["hits"]} hits, {stats["disk_hits"]} disk hits, {stats["rule_matches"]} rule matches' )
 
-  book_maker = WorkbookMaker( f'{g_WorkingDir}\\{g_WorkbookFile}' )
-  book_maker.AppendStatements( new_statements, categorizer )
-  book_maker.Save()
\ No newline at end of file
+  if profiler is not None:
+    profiling.Disable()
+    profiler.PrintSummary()
+    if args.profile is not None:
+      profiler.DumpProfile( args.profile )
+      print( f'cProfile stats written to {args.profile}' )
\ No newline at end of file
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import pickle
+from datetime import datetime
+from typing import Optional, List, Dict, Tuple, Iterable
+from bank      import Bank, BankManager
+from currency  import USD
+from statement import Statement, Transaction
+
+g_ManifestVersion = 1
+
+#------------------------------------------------------------------------------------------------
+def HashFile( path : str ) -> str:
+  file_hash = hashlib.sha256()
+  with open( path, 'rb' ) as hashed_file:
+    for block in iter( lambda : hashed_file.read( 1 << 20 ), b'' ):
+      file_hash.update( block )
+  return file_hash.hexdigest()
+
+def HashBytes( contents : bytes ) -> str:
+  return hashlib.sha256( contents ).hexdigest()
+
+#------------------------------------------------------------------------------------------------
+# What we know about one file in the statements directory. Files that aren't statements are
+#  recorded too (with no bank), so they're skipped without being opened again
+class ManifestEntry:
+  size         : int
+  mtime_ns     : int
+  content_hash : str
+  bank_name    : Optional[str]
+  account_id   : int
+  start_date   : Optional[datetime]
+  end_date     : Optional[datetime]
+  transactions : List[ Tuple[ str, int, datetime, str, bool ] ] # name, cents, date, category, is debt
+
+  def __init__( self, size : int, mtime_ns : int, content_hash : str, statement : Optional[Statement] ) -> None:
+    self.size         = size
+    self.mtime_ns     = mtime_ns
+    self.content_hash = content_hash
+    self.bank_name    = None
+    self.account_id   = -1
+    self.start_date   = None
+    self.end_date     = None
+    self.transactions = []
+    if statement is not None:
+      self.bank_name    = statement.bank_info.bank.name
+      self.account_id   = statement.account.id
+      self.start_date   = statement.start_date
+      self.end_date     = statement.end_date
+      self.transactions = [ ( tx.name, tx.amount.AsCents(), tx.date, tx.category, tx.is_debt ) for tx in statement.transactions ]
+
+  def ToStatement( self, statement_path : str, bank_manager : BankManager, columnar : bool = False ) -> Optional[Statement]:
+    if self.bank_name is None:
+      return None
+    statement = Statement( bank_manager.banks[ Bank[ self.bank_name ] ], columnar )
+    statement.account.id  = self.account_id
+    statement.start_date  = self.start_date
+    statement.end_date    = self.end_date
+    statement.source_path = statement_path
+    for name, cents, date, category, is_debt in self.transactions:
+      statement.transactions.append( Transaction( name, USD( cents ), statement.account, date, category, is_debt ) )
+    return statement
+
+#------------------------------------------------------------------------------------------------
+# Remembers every statement file already ingested, along with its parsed transactions, so a re-run
+#  only has to parse new or modified files. Files are considered unchanged if size and mtime match;
+#  if only those differ, the content hash decides. Parsed transactions depend on the bank and
+#  category config, so the manifest is dropped whenever either config changes.
+class StatementManifest:
+  path        : str
+  config_hash : str
+  entries     : Dict[ str, ManifestEntry ]
+  changed     : bool # a statement was added, modified or removed since the last import
+  dirty       : bool
+
+  def __init__( self, path : str, config_hash : str ) -> None:
+    self.path        = path
+    self.config_hash = config_hash
+    self.entries     = {}
+    self.changed     = False
+    self.dirty       = False
+
+    if os.path.isfile( path ):
+      try:
+        with open( path, 'rb' ) as manifest_file:
+          manifest = pickle.load( manifest_file )
+      except ( OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError ):
+        manifest = {}
+      # an older or foreign pickle is ignored like a stale one, and every statement is read again
+      if isinstance( manifest, dict ) and manifest.get( 'version' ) == g_ManifestVersion and manifest.get( 'config_hash' ) == config_hash \
+         and isinstance( manifest.get( 'entries' ), dict ):
+        self.entries = manifest[ 'entries' ]
+
+  def Lookup( self, statement_path : str ) -> Optional[ManifestEntry]:
+    entry = self.entries.get( statement_path )
+    if entry is None:
+      return None
+
+    stat = os.stat( statement_path )
+    if entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+      return entry
+
+    if entry.size == stat.st_size and entry.content_hash == HashFile( statement_path ):
+      entry.mtime_ns = stat.st_mtime_ns
+      self.dirty     = True
+      return entry
+    return None
+
+  # the file is only read again to hash it if neither its contents nor their hash are given
+  def Record( self, statement_path : str, statement : Optional[Statement], contents : Optional[bytes] = None, content_hash : Optional[str] = None ) -> None:
+    stat = os.stat( statement_path )
+    if content_hash is None:
+      content_hash = HashBytes( contents ) if contents is not None else HashFile( statement_path )
+    self.entries[ statement_path ] = ManifestEntry( stat.st_size, stat.st_mtime_ns, content_hash, statement )
+    self.changed = True
+    self.dirty   = True
+
+  # forgets files that are no longer in the statements directory
+  def Prune( self, statement_paths : Iterable[str] ) -> None:
+    present = set( statement_paths )
+    for statement_path in [ path for path in self.entries.keys() if path not in present ]:
+      del self.entries[ statement_path ]
+      self.changed = True
+      self.dirty   = True
+
+  def Save( self ) -> None:
+    if not self.dirty:
+      return
+    with open( self.path, 'wb' ) as manifest_file:
+      pickle.dump( { 'version' : g_ManifestVersion, 'config_hash' : self.config_hash, 'entries' : self.entries }, manifest_file )
+    self.dirty = False
\ No newline at end of file
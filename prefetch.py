@@ -0,0 +1,40 @@
+import collections
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Deque, Iterator, List, Tuple
+
+#------------------------------------------------------------------------------------------------
+def ReadFileBytes( path : str ) -> bytes:
+  with open( path, 'rb' ) as read_file:
+    return read_file.read()
+
+#------------------------------------------------------------------------------------------------
+# Reads files on a pool of `concurrency` threads while the caller works on the ones already read,
+#  so on a network share the latency of each open/read overlaps with parsing instead of adding
+#  up. Files come back in the order given. At most `concurrency` files are read ahead of the one
+#  being handed out, which bounds how much is held in memory. `reader` does the actual read, and
+#  can be swapped out (e.g. to add latency when trying this against a local directory)
+class StatementPrefetcher:
+  paths       : List[str]
+  concurrency : int
+  reader      : Callable[ [str], bytes ]
+
+  def __init__( self, paths : List[str], concurrency : int, reader : Callable[ [str], bytes ] = ReadFileBytes ) -> None:
+    self.paths       = paths
+    self.concurrency = max( concurrency, 1 )
+    self.reader      = reader
+
+  def __iter__( self ) -> Iterator[ Tuple[ str, bytes ] ]:
+    with ThreadPoolExecutor( max_workers=self.concurrency ) as executor:
+      pending : Deque[ Tuple[ str, Future ] ] = collections.deque()
+      paths = iter( self.paths )
+      for path in paths:
+        pending.append( ( path, executor.submit( self.reader, path ) ) )
+        if len( pending ) > self.concurrency:
+          break
+
+      while len( pending ) > 0:
+        path, future = pending.popleft()
+        next_path = next( paths, None )
+        if next_path is not None:
+          pending.append( ( next_path, executor.submit( self.reader, next_path ) ) )
+        yield path, future.result()
\ No newline at end of file
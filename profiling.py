@@ -0,0 +1,143 @@
+import contextlib
+import cProfile
+import time
+import tracemalloc
+from typing import Optional, List, Dict, Callable, Iterator
+
+#------------------------------------------------------------------------------------------------
+# wall/cpu time, peak memory and counters for one stage of an import. Counters are whatever the
+#  code running in the stage reports: 'rows' by convention, plus anything else worth knowing
+class StageTiming:
+  name       : str
+  depth      : int
+  wall       : float
+  cpu        : float
+  peak_bytes : int
+  counters   : Dict[ str, int ]
+  times      : Dict[ str, float ]
+
+  def __init__( self, name : str, depth : int ) -> None:
+    self.name       = name
+    self.depth      = depth
+    self.wall       = 0.0
+    self.cpu        = 0.0
+    self.peak_bytes = 0
+    self.counters   = {}
+    self.times      = {}
+
+#------------------------------------------------------------------------------------------------
+# Records StageTimings for every stage entered while it's active. Stages nest; counters and times
+#  reported inside a stage count towards every stage it's nested in. Peak memory is tracked with
+#  tracemalloc, which slows everything down noticeably, so it's optional
+class Profiler:
+  stages       : List[ StageTiming ]
+  open_stages  : List[ StageTiming ]
+  track_memory : bool
+  profile      : Optional[ cProfile.Profile ]
+
+  def __init__( self, track_memory : bool = True, profile : bool = False ) -> None:
+    self.stages       = []
+    self.open_stages  = []
+    self.track_memory = track_memory
+    self.profile      = cProfile.Profile() if profile else None
+
+  def Start( self ) -> None:
+    if self.track_memory:
+      tracemalloc.start()
+    if self.profile is not None:
+      self.profile.enable()
+
+  def Stop( self ) -> None:
+    if self.profile is not None:
+      self.profile.disable()
+    if self.track_memory:
+      tracemalloc.stop()
+
+  @contextlib.contextmanager
+  def Stage( self, name : str ) -> Iterator[ StageTiming ]:
+    stage = StageTiming( name, len( self.open_stages ) )
+    self.stages.append( stage )
+
+    # the parent's peak so far is kept before the peak is reset for this stage
+    start_bytes = 0
+    if self.track_memory:
+      start_bytes, peak_bytes = tracemalloc.get_traced_memory()
+      for parent in self.open_stages:
+        parent.peak_bytes = max( parent.peak_bytes, peak_bytes )
+      tracemalloc.reset_peak()
+
+    self.open_stages.append( stage )
+    wall_begin = time.perf_counter()
+    cpu_begin  = time.process_time()
+    try:
+      yield stage
+    finally:
+      stage.wall = time.perf_counter() - wall_begin
+      stage.cpu  = time.process_time() - cpu_begin
+      self.open_stages.pop()
+      if self.track_memory:
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        stage.peak_bytes = max( stage.peak_bytes, peak_bytes )
+        for parent in self.open_stages:
+          parent.peak_bytes = max( parent.peak_bytes, stage.peak_bytes )
+        stage.peak_bytes -= start_bytes
+
+  def Count( self, counter : str, count : int ) -> None:
+    for stage in self.open_stages:
+      stage.counters[ counter ] = stage.counters.get( counter, 0 ) + count
+
+  def AddTime( self, timer : str, seconds : float ) -> None:
+    for stage in self.open_stages:
+      stage.times[ timer ] = stage.times.get( timer, 0.0 ) + seconds
+
+  def PrintSummary( self ) -> None:
+    name_width = max( [ len( stage.name ) + 2 * stage.depth for stage in self.stages ] + [ 5 ] )
+    print( f'{"stage":<{name_width}} {"wall s":>9} {"cpu s":>9} {"rows":>9} {"rows/s":>10} {"peak MB":>9}' )
+    for stage in self.stages:
+      rows     = stage.counters.get( 'rows' )
+      rows_str = f'{rows:>9}' if rows is not None else f'{"":>9}'
+      rate_str = f'{rows / stage.wall:>10.0f}' if rows is not None and stage.wall > 0 else f'{"":>10}'
+      peak_str = f'{stage.peak_bytes / ( 1 << 20 ):>9.1f}' if self.track_memory else f'{"":>9}'
+      extras   = [ f'{counter}={count}' for counter, count in stage.counters.items() if counter != 'rows' ]
+      extras  += [ f'{timer}={seconds * 1000:.1f}ms' for timer, seconds in stage.times.items() ]
+      print( f'{"  " * stage.depth + stage.name:<{name_width}} {stage.wall:>9.3f} {stage.cpu:>9.3f} {rows_str} {rate_str} {peak_str}  {" ".join( extras )}'.rstrip() )
+
+  def DumpProfile( self, path : str ) -> None:
+    if self.profile is not None:
+      self.profile.dump_stats( path )
+
+#------------------------------------------------------------------------------------------------
+# The hooks below are what the rest of the importer calls. They do nothing unless a profiler has
+#  been enabled, so they're cheap enough to leave in
+g_Profiler  : Optional[ Profiler ] = None
+g_NullStage = contextlib.nullcontext()
+
+def Enable( track_memory : bool = True, profile : bool = False ) -> Profiler:
+  global g_Profiler
+  g_Profiler = Profiler( track_memory, profile )
+  g_Profiler.Start()
+  return g_Profiler
+
+def Disable() -> None:
+  global g_Profiler
+  if g_Profiler is not None:
+    g_Profiler.Stop()
+  g_Profiler = None
+
+def Stage( name : str ):
+  if g_Profiler is None:
+    return g_NullStage
+  return g_Profiler.Stage( name )
+
+def Count( counter : str, count : int = 1 ) -> None:
+  if g_Profiler is not None:
+    g_Profiler.Count( counter, count )
+
+# calls fn, adding the time it took to `timer` when profiling
+def Measure( timer : str, fn : Callable, *args ):
+  if g_Profiler is None:
+    return fn( *args )
+  begin  = time.perf_counter()
+  result = fn( *args )
+  g_Profiler.AddTime( timer, time.perf_counter() - begin )
+  return result
\ No newline at end of file
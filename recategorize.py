@@ -0,0 +1,195 @@
+import os
+import openpyxl
+from openpyxl.utils import range_boundaries
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Tuple
+from bank      import Bank, BankManager, BankType, DateParser
+from currency  import USD
+from statement import Statement, Transaction, Categorizer, TransferIndex
+from workbook_maker import WorkbookMaker, ExcelCell, SummaryRows, SummarizeTransactions, SumGroups, SumAccountGroups
+
+g_TransactionTableSuffix = '_tx'
+g_SummaryTableSuffix     = '_summary'
+
+#------------------------------------------------------------------------------------------------
+# Runs the category rules again over transactions that were already imported, changing them in
+#  place. The rules only run once per distinct description. Is Debt follows the new category, and
+#  transfers are matched again, but only for amounts where something became or stopped being a
+#  transfer. Returns how many transactions moved from one category to another
+def Recategorize( transactions : List[ Transaction ], categorizer : Categorizer, transfer_window : Optional[timedelta] = None, pair_transfers : bool = False ) -> Dict[ Tuple[ str, str ], int ]:
+  categories = { name : categorizer.GetCategoryForName( name ) for name in { tx.name for tx in transactions } }
+
+  moves   : Dict[ Tuple[ str, str ], int ] = {}
+  amounts = set()
+  for tx in transactions:
+    category = categories[ tx.name ]
+    if category == tx.category:
+      continue
+
+    moves[ ( tx.category, category ) ] = moves.get( ( tx.category, category ), 0 ) + 1
+    was_transfer = tx.IsTransfer()
+    tx.category  = category
+    tx.is_debt   = tx.account.bank_info.type == BankType.CreditCard or category == 'Loans'
+    if was_transfer != tx.IsTransfer():
+      amounts.add( tx.amount.AsCents() )
+      tx.matched_transfer = False
+
+  if len( amounts ) > 0:
+    transfer_index = TransferIndex()
+    for tx in transactions:
+      transfer_index.Add( tx, reset=False )
+    transfer_index.Resolve( transfer_window, pair_transfers, amounts )
+  return moves
+
+#------------------------------------------------------------------------------------------------
+def PrintMoves( where : str, moves : Dict[ Tuple[ str, str ], int ], flags_changed : int ) -> None:
+  print( f'{where}: {sum( moves.values() )} transactions changed category, {flags_changed} Is Debt / Matched Transfer values changed' )
+  for ( old_category, new_category ), count in sorted( moves.items(), key=lambda move : -move[1] ):
+    print( f'  {old_category} -> {new_category}: {count}' )
+
+#------------------------------------------------------------------------------------------------
+# one row of a period sheet's transaction table
+class TableRow:
+  row              : int
+  tx               : Transaction
+  category         : str
+  is_debt          : bool
+  matched_transfer : bool
+
+  def __init__( self, row : int, tx : Transaction ) -> None:
+    self.row              = row
+    self.tx               = tx
+    self.category         = tx.category
+    self.is_debt          = tx.is_debt
+    self.matched_transfer = tx.matched_transfer
+
+def CellBool( value ) -> bool:
+  return str( value ).upper() == 'TRUE'
+
+# transactions back out of a transaction table written by WorkbookMaker, with one statement per
+#  account named in it
+def ReadTransactionTable( sheet, ref : str, bank_manager : BankManager ) -> Tuple[ Dict[ str, int ], List[ TableRow ], Dict[ str, Statement ] ]:
+  min_col, min_row, max_col, max_row = range_boundaries( ref )
+  columns = { sheet.cell( row=min_row, column=col ).value : col for col in range( min_col, max_col + 1 ) }
+
+  rows         : List[ TableRow ] = []
+  statements   : Dict[ str, Statement ] = {}
+  parsed_dates : Dict[ str, datetime ] = {}
+  date_parser  = DateParser( '%m/%d/%Y' )
+  for row in range( min_row + 1, max_row + 1 ):
+    def Value( header : str ):
+      return sheet.cell( row=row, column=columns[ header ] ).value
+
+    account_name = Value( 'Account' )
+    statement    = statements.get( account_name )
+    if statement is None:
+      bank_name, _, account_id = account_name.partition( ' ' )
+      statement = Statement( bank_manager.banks[ Bank[ bank_name ] ] )
+      statement.account.id = int( account_id ) if account_id != '' else -1
+      statements[ account_name ] = statement
+
+    date = Value( 'Date' )
+    if not isinstance( date, datetime ):
+      date_str = date
+      date     = parsed_dates.get( date_str )
+      if date is None:
+        date = date_parser( date_str )
+        parsed_dates[ date_str ] = date
+
+    tx = Transaction( Value( 'Description' ), USD( round( Value( 'Amount' ) * 100 ) ), statement.account, date, Value( 'Category' ), CellBool( Value( 'Is Debt' ) ) )
+    tx.matched_transfer = CellBool( Value( 'Matched Transfer' ) )
+    statement.transactions.append( tx )
+    rows.append( TableRow( row, tx ) )
+  return columns, rows, statements
+
+#------------------------------------------------------------------------------------------------
+# Rewrites a static summary's values that changed. Formula summaries are left for Excel to
+#  recalculate, unless categories were added or removed, in which case the summary is rebuilt in place
+def UpdateSummary( book_maker : WorkbookMaker, sheet, summary_name : str, tx_table_name : str, statements : List[ Statement ], categorizer : Categorizer ) -> int:
+  min_col, min_row, max_col, max_row = range_boundaries( sheet.tables[ summary_name ].ref )
+  accounts     = [ sheet.cell( row=min_row, column=col ).value for col in range( min_col + 2, max_col + 1 ) ]
+  labels       = [ sheet.cell( row=row, column=min_col ).value for row in range( min_row + 1, max_row + 1 ) ]
+  first_total  = sheet.cell( row=min_row + 1, column=min_col + 1 ).value
+  static       = not ( isinstance( first_total, str ) and first_total.startswith( '=' ) )
+  summary_rows = SummaryRows( tx_table_name, categorizer )
+
+  if labels == [ summary_row[0] for summary_row in summary_rows ]:
+    if not static:
+      return 0
+    groups  = SummarizeTransactions( statements )
+    changed = 0
+    for row, ( _, _, total_filter, _, acct_filter ) in enumerate( summary_rows, min_row + 1 ):
+      values = [ SumGroups( groups, total_filter ) ] + [ SumAccountGroups( groups, acct_filter, account ) for account in accounts ]
+      for col, value in enumerate( values, min_col + 1 ):
+        cell = sheet.cell( row=row, column=col )
+        if cell.value != value:
+          cell.value = value
+          changed   += 1
+    return changed
+
+  for row in sheet.iter_rows( min_row=min_row - 1, max_row=max_row, min_col=min_col, max_col=max_col ):
+    for cell in row:
+      cell.value = None
+  del sheet.tables[ summary_name ]
+  book_maker.static_summary = static
+  end_cell = book_maker.MakeSummaryTable( summary_name, ExcelCell( min_col, min_row - 1 ), sheet, tx_table_name, statements, categorizer )
+  return ( end_cell.row - min_row + 1 ) * ( len( accounts ) + 2 )
+
+#------------------------------------------------------------------------------------------------
+# recategorizes every period sheet in the workbook, only writing cells whose value changed.
+#  Returns whether anything changed
+def RecategorizeWorkbook( workbook, book_maker : WorkbookMaker, bank_manager : BankManager, categorizer : Categorizer, transfer_window : Optional[timedelta] = None, pair_transfers : bool = False ) -> bool:
+  any_changed = False
+  for sheet in workbook.worksheets:
+    for tx_table_name in [ name for name in sheet.tables.keys() if name.endswith( g_TransactionTableSuffix ) ]:
+      columns, rows, statements = ReadTransactionTable( sheet, sheet.tables[ tx_table_name ].ref, bank_manager )
+      moves = Recategorize( [ table_row.tx for table_row in rows ], categorizer, transfer_window, pair_transfers )
+
+      flags_changed = 0
+      for table_row in rows:
+        tx = table_row.tx
+        if tx.category != table_row.category:
+          sheet.cell( row=table_row.row, column=columns[ 'Category' ] ).value = tx.category
+        if tx.is_debt != table_row.is_debt:
+          sheet.cell( row=table_row.row, column=columns[ 'Is Debt' ] ).value = 'TRUE' if tx.is_debt else 'FALSE'
+          flags_changed += 1
+        if tx.matched_transfer != table_row.matched_transfer:
+          sheet.cell( row=table_row.row, column=columns[ 'Matched Transfer' ] ).value = 'TRUE' if tx.matched_transfer else 'FALSE'
+          flags_changed += 1
+
+      summary_name    = tx_table_name[ :-len( g_TransactionTableSuffix ) ] + g_SummaryTableSuffix
+      summary_changed = 0
+      if summary_name in sheet.tables:
+        summary_changed = UpdateSummary( book_maker, sheet, summary_name, tx_table_name, list( statements.values() ), categorizer )
+
+      PrintMoves( sheet.title, moves, flags_changed )
+      any_changed = any_changed or len( moves ) > 0 or summary_changed > 0
+  return any_changed
+
+#------------------------------------------------------------------------------------------------
+# a split workbook is a directory with one workbook per period, see WorkbookMaker
+def RecategorizeWorkbookFile( workbook_path : str, split_periods : bool, bank_manager : BankManager, categorizer : Categorizer, transfer_window : Optional[timedelta] = None, pair_transfers : bool = False ) -> None:
+  if not split_periods:
+    book_maker = WorkbookMaker( workbook_path )
+    if RecategorizeWorkbook( book_maker.workbook, book_maker, bank_manager, categorizer, transfer_window, pair_transfers ):
+      book_maker.Save()
+    return
+
+  book_maker = WorkbookMaker( workbook_path, split_periods=True )
+  for filename in sorted( os.listdir( workbook_path ) ):
+    if filename.endswith( '.xlsx' ):
+      period_path = os.path.join( workbook_path, filename )
+      workbook    = openpyxl.load_workbook( period_path )
+      if RecategorizeWorkbook( workbook, book_maker, bank_manager, categorizer, transfer_window, pair_transfers ):
+        workbook.save( period_path )
+
+#------------------------------------------------------------------------------------------------
+def RecategorizeStore( store, bank_manager : BankManager, categorizer : Categorizer, transfer_window : Optional[timedelta] = None, pair_transfers : bool = False ) -> None:
+  rows    = store.QueryAll( bank_manager )
+  before  = [ ( tx.category, tx.is_debt, tx.matched_transfer ) for _, tx in rows ]
+  moves   = Recategorize( [ tx for _, tx in rows ], categorizer, transfer_window, pair_transfers )
+
+  changed       = [ ( row_id, tx ) for ( row_id, tx ), old in zip( rows, before ) if ( tx.category, tx.is_debt, tx.matched_transfer ) != old ]
+  flags_changed = sum( ( tx.is_debt != old[1] ) + ( tx.matched_transfer != old[2] ) for ( _, tx ), old in zip( rows, before ) )
+  store.UpdateTransactions( changed )
+  PrintMoves( store.path, moves, flags_changed )
\ No newline at end of file
@@ -1,34 +1,254 @@
+import bisect
 import csv
+import functools
+import hashlib
 import os
+import pickle
 import re
-import yaml
-from datetime import datetime
-from typing import List, Dict, Pattern
-from bank   import Bank, BankInfo, BankType
+import profiling
+from datetime import datetime, timedelta
+from typing import List, Dict, Iterable, Iterator, Optional, Pattern, Set, TextIO, Tuple, Union
+from bank   import BankInfo, BankType
 from currency import USD
+from transaction_table import TransactionTable
+
+#------------------------------------------------------------------------------------------------
+g_RegexMetaChars = set( '.^$*+?{}[]|()' )
+
+# returns the plain text a pattern matches if it has no regex operators, otherwise None
+def LiteralText( pattern : str ) -> Optional[str]:
+  text    : List[str] = []
+  escaped : bool      = False
+  for c in pattern:
+    if escaped:
+      if c.isalnum():
+        return None
+      text.append( c )
+      escaped = False
+    elif c == '\\':
+      escaped = True
+    elif c in g_RegexMetaChars:
+      return None
+    else:
+      text.append( c )
+  if escaped:
+    return None
+  return ''.join( text )
+
+# a backreference (\1, (?P=name)) or a conditional group ((?(1)...)) not preceded by an escaping
+#  backslash. Group numbers shift once a pattern is merged with others, so these rules can't be
+#  combined with the rest
+g_GroupReference = re.compile( r'(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?P=|\(\?\()' )
+
+#------------------------------------------------------------------------------------------------
+# Builds a regex out of a set of literals whose alternation is shaped like a trie, so the regex
+#  engine only walks one branch per character instead of trying every literal at every position
+def MakeTrieRegex( literals : List[str] ) -> str:
+  trie : Dict = {}
+  for literal in literals:
+    node = trie
+    for c in literal:
+      node = node.setdefault( c, {} )
+    node[ '' ] = None
+
+  def NodeToRegex( node : Dict ) -> str:
+    is_terminal = '' in node
+    branches    = [ re.escape( c ) + NodeToRegex( child ) for c, child in sorted( node.items() ) if c != '' ]
+    if len( branches ) == 0:
+      return ''
+    branch_regex = branches[0] if len( branches ) == 1 else f'(?:{ "|".join( branches ) })'
+    if is_terminal:
+      return f'(?:{branch_regex})?'
+    return branch_regex
+
+  return NodeToRegex( trie )
+
+#------------------------------------------------------------------------------------------------
+# Matches a name against every category rule at once. The result is the category of the first
+#  rule (in config order) that matches anywhere in the name, same as testing each rule in turn.
+#
+# Plain-substring rules go through a single trie regex. Every position it matches at reports the
+#  longest literal there; the literals that are prefixes of it match at the same position, so
+#  each literal is assigned the lowest rule index among itself and its prefixes.
+# The remaining regex rules are combined into one alternation of lookaheads anchored at the
+#  start of the name. Alternatives are tried in order, so the first one that succeeds is the
+#  lowest-indexed regex rule that matches anywhere. Rules that refer to their own groups are
+#  tested one at a time instead.
+class CategoryMatcher:
+  rule_categories   : List[str]
+  literal_regex     : Optional[Pattern]
+  literal_rule_idx  : Dict[str, int]
+  regex_rules       : Optional[Pattern]
+  regex_group_idx   : Dict[str, int]
+  sequential_rules  : List[Tuple[int, Pattern]]
+
+  def __init__( self, rules : List[Tuple[str, Pattern]] ) -> None:
+    self.rule_categories  = [ category for category, _ in rules ]
+    self.literal_regex    = None
+    self.literal_rule_idx = {}
+    self.regex_rules      = None
+    self.regex_group_idx  = {}
+    self.sequential_rules = []
+
+    regex_rules : List[Tuple[int, Pattern]] = []
+    for rule_idx, ( _, pattern ) in enumerate( rules ):
+      literal = LiteralText( pattern.pattern ) if pattern.flags == re.UNICODE else None
+      if literal is not None and len( literal ) > 0:
+        if literal not in self.literal_rule_idx:
+          self.literal_rule_idx[ literal ] = rule_idx
+      elif g_GroupReference.search( pattern.pattern ) is not None:
+        self.sequential_rules.append( ( rule_idx, pattern ) )
+      else:
+        regex_rules.append( ( rule_idx, pattern ) )
+
+    if len( self.literal_rule_idx ) > 0:
+      for literal in self.literal_rule_idx.keys():
+        for prefix_len in range( 1, len( literal ) ):
+          prefix_idx = self.literal_rule_idx.get( literal[ :prefix_len ] )
+          if prefix_idx is not None and prefix_idx < self.literal_rule_idx[ literal ]:
+            self.literal_rule_idx[ literal ] = prefix_idx
+      self.literal_regex = re.compile( f'(?=({ MakeTrieRegex( list( self.literal_rule_idx.keys() ) ) }))' )
+
+    if len( regex_rules ) > 0:
+      alternatives : List[str] = []
+      for rule_idx, pattern in regex_rules:
+        group_name = f'_rule{rule_idx}'
+        self.regex_group_idx[ group_name ] = rule_idx
+        alternatives.append( f'(?=[\\s\\S]*?(?:{pattern.pattern}))(?P<{group_name}>)' )
+      try:
+        self.regex_rules = re.compile( '|'.join( alternatives ) )
+      except re.error:
+        # patterns with inline flags or clashing group names can't be combined
+        self.regex_rules      = None
+        self.regex_group_idx  = {}
+        self.sequential_rules = sorted( self.sequential_rules + regex_rules, key=lambda rule: rule[0] )
+
+  def Match( self, name : str ) -> Optional[str]:
+    best_idx = len( self.rule_categories )
+
+    if self.literal_regex is not None:
+      for m in self.literal_regex.finditer( name ):
+        rule_idx = self.literal_rule_idx[ m.group(1) ]
+        if rule_idx < best_idx:
+          best_idx = rule_idx
+
+    if self.regex_rules is not None:
+      m = self.regex_rules.match( name )
+      if m is not None:
+        rule_idx = self.regex_group_idx[ m.lastgroup ]
+        if rule_idx < best_idx:
+          best_idx = rule_idx
+
+    for rule_idx, pattern in self.sequential_rules:
+      if rule_idx >= best_idx:
+        break
+      if pattern.search( name ) is not None:
+        best_idx = rule_idx
+        break
+
+    if best_idx < len( self.rule_categories ):
+      return self.rule_categories[ best_idx ]
+    return None
 
 #------------------------------------------------------------------------------------------------
 class Categorizer:
-  categories : Dict[ str, List[Pattern] ]
+  categories  : Dict[ str, List[Pattern] ]
+  matcher     : CategoryMatcher
+  config_hash : str
+  cache_size  : Optional[int]
+  cache_path  : Optional[str]
+  disk_cache  : Dict[ str, str ]
+  new_names   : Dict[ str, str ]
+  disk_hits   : int
 
-  def __init__( self, path_to_config ) -> None:
+  # cache_size bounds the in-process name -> category LRU. If cache_path is given, categories are
+  #  also persisted there between runs, and the file is ignored once category config changes
+  def __init__( self, path_to_config, cache_size : Optional[int] = 4096, cache_path : Optional[str] = None ) -> None:
+    import yaml
     self.categories = {}
     with open( path_to_config, 'r' ) as config_file:
-      config_yaml = yaml.safe_load( config_file )
+      config_text = config_file.read()
+      config_yaml = yaml.safe_load( config_text )
       for category in config_yaml.keys():
         if config_yaml[ category ] is not None:
           self.categories[ category ] = [ re.compile( pattern ) for pattern in config_yaml[ category ] ]
         else:
           self.categories[ category ] = []
-    self.categories[ 'Unknown' ] = [ r'^$' ]
+    self.categories[ 'Unknown' ] = [ re.compile( r'^$' ) ]
+    self.matcher     = CategoryMatcher( [ ( cat, pattern ) for cat, patterns in self.categories.items() for pattern in patterns ] )
+    self.config_hash = hashlib.sha256( config_text.encode( 'utf-8' ) ).hexdigest()
+
+    self.cache_size = cache_size
+    self.cache_path = cache_path
+    self.disk_cache = {}
+    self.new_names  = {}
+    self.disk_hits  = 0
+    self.lookup     = functools.lru_cache( maxsize=cache_size )( self.LookupCategory )
+    if cache_path is not None:
+      self.LoadCache()
+
+  # for categorizers that weren't built from yaml, e.g. ones loaded from the config cache
+  def UseCacheFile( self, cache_path : Optional[str] ) -> None:
+    self.cache_path = cache_path
+    if cache_path is not None:
+      self.LoadCache()
+
+  # the LRU wrapper can't be pickled, so it's rebuilt (empty) when a Categorizer is shipped to a worker
+  def __getstate__( self ):
+    state = self.__dict__.copy()
+    del state[ 'lookup' ]
+    return state
+
+  def __setstate__( self, state ) -> None:
+    self.__dict__.update( state )
+    self.lookup = functools.lru_cache( maxsize=self.cache_size )( self.LookupCategory )
 
   def GetCategoryForName( self, name : str ) -> str:
-    for cat, patterns in self.categories.items():
-      for pattern in patterns:
-        if re.search( pattern, name ) is not None:
-          return cat
-        
-    return 'Unknown'
+    return self.lookup( name )
+
+  def LookupCategory( self, name : str ) -> str:
+    category = self.disk_cache.get( name )
+    if category is not None:
+      self.disk_hits += 1
+      return category
+
+    category = profiling.Measure( 'categorize', self.matcher.Match, name )
+    if category is None:
+      category = 'Unknown'
+    if self.cache_path is not None:
+      self.new_names[ name ] = category
+    return category
+
+  def CacheStats( self ) -> Dict[ str, int ]:
+    info = self.lookup.cache_info()
+    return {
+      'hits'        : info.hits,
+      'misses'      : info.misses,
+      'disk_hits'   : self.disk_hits,
+      'rule_matches': info.misses - self.disk_hits,
+      'size'        : info.currsize,
+    }
+
+  def LoadCache( self ) -> None:
+    if not os.path.isfile( self.cache_path ):
+      return
+    try:
+      with open( self.cache_path, 'rb' ) as cache_file:
+        cache = pickle.load( cache_file )
+    except ( OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError ):
+      return
+    if not isinstance( cache, dict ) or not isinstance( cache.get( 'names' ), dict ):
+      return
+    if cache.get( 'config_hash' ) == self.config_hash:
+      self.disk_cache = cache[ 'names' ]
+
+  def SaveCache( self ) -> None:
+    if self.cache_path is None or len( self.new_names ) == 0:
+      return
+    self.disk_cache.update( self.new_names )
+    self.new_names = {}
+    with open( self.cache_path, 'wb' ) as cache_file:
+      pickle.dump( { 'config_hash' : self.config_hash, 'names' : self.disk_cache }, cache_file )
 
 #------------------------------------------------------------------------------------------------
 class Account:
@@ -45,6 +265,8 @@ class Account:
 
 #------------------------------------------------------------------------------------------------
 class Transaction:
+  __slots__ = ( 'name', 'amount', 'date', 'category', 'account', 'matched_transfer', 'is_debt' )
+
   name             : str
   amount           : USD
   date             : datetime
@@ -65,67 +287,301 @@ class Transaction:
   def __repr__( self ) -> str:
     return f'{str(self.account)} : {self.amount} on {self.date}, {self.name}'
 
+  def IsTransfer( self ) -> bool:
+    return self.category == 'Transfer' or self.category == 'Credit Card Payment'
+
 #------------------------------------------------------------------------------------------------
 class Statement:
   bank_info    : BankInfo
   account      : Account
   start_date   : datetime
   end_date     : datetime
-  transactions : List[Transaction]
+  transactions : Union[ List[Transaction], TransactionTable ]
+  source_path  : Optional[str]
   
-  def __init__( self, bank_info : BankInfo ):
+  # columnar keeps the transactions in a TransactionTable instead of a list of Transactions
+  def __init__( self, bank_info : BankInfo, columnar : bool = False ):
     self.bank_info    = bank_info
     self.account      = Account( bank_info )
-    self.transactions = []
+    self.transactions = TransactionTable() if columnar else []
     self.start_date   = None
     self.end_date     = None
+    self.source_path  = None
 
   def __repr__( self ) -> str:
     return f'Statement for {str(self.account)} from {self.start_date} to {self.end_date}:\n  ' + '\n  '.join( [ str(t) for t in self.transactions] )
   
-  def Read( self, statement_path : str, categorizer : Categorizer ) -> None:
+  # If statement_file is given, it's read instead of opening statement_path, and its header line
+  #  must already have been read (e.g. to identify the bank). batch parses the rows a chunk at a
+  #  time with NumPy (see batch_reader.py) instead of one by one
+  def Read( self, statement_path : str, categorizer : Categorizer, statement_file : Optional[TextIO] = None, batch : bool = False ) -> None:
+    row_count = len( self.transactions )
+    self.BeginRead( statement_path )
+    if statement_file is None:
+      with open( statement_path, 'r' ) as statement_file:
+        statement_file.readline() # skip the header
+        self.ReadRows( statement_file, categorizer, batch )
+    else:
+      self.ReadRows( statement_file, categorizer, batch )
+    self.EndRead( statement_path )
+    profiling.Count( 'rows', len( self.transactions ) - row_count )
+
+  def ReadRows( self, statement_file : TextIO, categorizer : Categorizer, batch : bool ) -> None:
+    if batch:
+      from batch_reader import ReadRowsBatched
+      ReadRowsBatched( self, statement_file, categorizer )
+    else:
+      self.transactions.extend( self.IterRows( statement_file, categorizer ) )
+
+  def BeginRead( self, statement_path : str ) -> None:
+    self.source_path = statement_path
+
+    # get account info
+    if self.bank_info.account_id_pattern is not None:
+      m = re.match( self.bank_info.account_id_pattern, os.path.basename( statement_path ) )
+      if m is not None:
+        self.account.id = int( m.group(1) )
+
+  # extract general info about statement (account, start/end date if available)
+  def EndRead( self, statement_path : str ) -> None:
     file_basename = os.path.basename( statement_path )
+    if self.bank_info.date_begin_pattern is not None:
+      inferred_date = self.bank_info.date_begin_pattern.Match( file_basename, 'start date', self.bank_info.bank.name )
+      if inferred_date is not None:
+        self.start_date = inferred_date
+
+    if self.bank_info.date_end_pattern is not None:
+      inferred_date = self.bank_info.date_end_pattern.Match( file_basename, 'end date', self.bank_info.bank.name )
+      if inferred_date is not None:
+        self.end_date = inferred_date
+
+  # start/end dates are updated as rows go by
+  def IterRows( self, statement_file : TextIO, categorizer : Categorizer ) -> Iterator[Transaction]:
+    # statements repeat the same few dates over and over, each one is only parsed once
+    parsed_dates : Dict[ str, datetime ] = {}
+    date_parser = self.bank_info.date_parser
+
+    for row in csv.reader( statement_file ):
+      amount   = USD.FromString( row[ self.bank_info.amount_idx ] )
+      date_str = row[ self.bank_info.date_idx ]
+      date     = parsed_dates.get( date_str )
+      if date is None:
+        date = date_parser( date_str )
+        parsed_dates[ date_str ] = date
+      name     = row[ self.bank_info.name_idx ]
+      category = categorizer.GetCategoryForName( name )
+      is_debt  = self.account.bank_info.type == BankType.CreditCard or category == 'Loans'
+
+      if self.start_date is None or self.start_date > date:
+        self.start_date = date
+
+      if self.end_date is None or self.end_date < date:
+        self.end_date = date
+
+      yield Transaction( name, amount, self.account, date, category, is_debt )
+
+#------------------------------------------------------------------------------------------------
+# marks every transfer in `transactions` matched to a transfer in `opposites` (amounts are opposite)
+#  that happened within `date_window` of it, or on any date if there's no window
+def MatchTransfersInWindow( transactions : List[Transaction], opposites : List[Transaction], date_window : Optional[timedelta] ) -> None:
+  if date_window is None:
+    for tx in transactions:
+      tx.matched_transfer = True
+    return
+
+  opposite_dates = sorted( tx.date for tx in opposites )
+  for tx in transactions:
+    closest_idx = bisect.bisect_left( opposite_dates, tx.date - date_window )
+    if closest_idx < len( opposite_dates ) and opposite_dates[ closest_idx ] <= tx.date + date_window:
+      tx.matched_transfer = True
+
+#------------------------------------------------------------------------------------------------
+# pairs transfers with opposite transfers one-to-one, earliest first, so one transfer can't match
+#  several others. Pairing greedily in date order finds the most pairs possible for a fixed window
+def PairTransfers( transactions : List[Transaction], opposites : List[Transaction], date_window : Optional[timedelta] ) -> None:
+  transactions = sorted( transactions, key=lambda tx : tx.date )
+  opposites    = sorted( opposites,    key=lambda tx : tx.date )
+
+  opposite_idx = 0
+  for tx in transactions:
+    if date_window is not None:
+      while opposite_idx < len( opposites ) and opposites[ opposite_idx ].date < tx.date - date_window:
+        opposite_idx += 1
+    if opposite_idx >= len( opposites ):
+      break
+    if date_window is None or opposites[ opposite_idx ].date <= tx.date + date_window:
+      tx.matched_transfer                        = True
+      opposites[ opposite_idx ].matched_transfer = True
+      opposite_idx += 1
+
+#------------------------------------------------------------------------------------------------
+# a zero amount has no sign left to tell the two sides of a transfer apart, so zero transfers are
+#  matched with each other instead, neighbours in date order. Pairing neighbours greedily finds the
+#  most pairs possible for a fixed window, as in PairTransfers
+def MatchZeroTransfers( transfers : List[Transaction], date_window : Optional[timedelta], one_to_one : bool ) -> None:
+  transfers = sorted( transfers, key=lambda tx : tx.date )
+
+  def InWindow( tx : Transaction, other : Transaction ) -> bool:
+    return date_window is None or abs( other.date - tx.date ) <= date_window
+
+  if one_to_one:
+    idx = 0
+    while idx + 1 < len( transfers ):
+      if InWindow( transfers[ idx ], transfers[ idx + 1 ] ):
+        transfers[ idx ].matched_transfer     = True
+        transfers[ idx + 1 ].matched_transfer = True
+        idx += 2
+      else:
+        idx += 1
+    return
+
+  for idx, tx in enumerate( transfers ):
+    if ( idx > 0 and InWindow( tx, transfers[ idx - 1 ] ) ) or ( idx + 1 < len( transfers ) and InWindow( tx, transfers[ idx + 1 ] ) ):
+      tx.matched_transfer = True
+
+#------------------------------------------------------------------------------------------------
+# Transfers and credit card payments indexed by signed amount in cents, so each one is only
+#  compared with transfers of the opposite amount. Only transfers are kept, so transactions can be
+#  streamed through Add() without holding on to the rest of them
+class TransferIndex:
+  transfers_by_amt : Dict[ int, List[Transaction] ]
+
+  def __init__( self ) -> None:
+    self.transfers_by_amt = {}
+
+  # reset=False keeps the transfer's current match, for when only some amounts are resolved again
+  def Add( self, tx : Transaction, reset : bool = True ) -> None:
+    if tx.IsTransfer():
+      if reset:
+        tx.matched_transfer = False
+      self.transfers_by_amt.setdefault( tx.amount.AsCents(), [] ).append( tx )
+
+  # adds or forgets all of a statement's transfers, returning their amounts to resolve again
+  def AddStatement( self, statement : Statement, reset : bool = True ) -> Set[int]:
+    amounts = set()
+    for tx in statement.transactions:
+      if tx.IsTransfer():
+        self.Add( tx, reset )
+        amounts.add( tx.amount.AsCents() )
+    return amounts
+
+  def RemoveStatement( self, statement : Statement ) -> Set[int]:
+    amounts = { tx.amount.AsCents() for tx in statement.transactions if tx.IsTransfer() }
+    for amt in amounts:
+      remaining = [ tx for tx in self.transfers_by_amt.get( amt, [] ) if tx.account is not statement.account ]
+      if len( remaining ) > 0:
+        self.transfers_by_amt[ amt ] = remaining
+      else:
+        self.transfers_by_amt.pop( amt, None )
+    return amounts
+
+  # with `amounts`, only transfers of those amounts (either way) are matched again
+  def Resolve( self, date_window : Optional[timedelta] = None, one_to_one : bool = False, amounts : Optional[ Iterable[int] ] = None ) -> None:
+    pending = self.transfers_by_amt.items()
+    if amounts is not None:
+      pending = []
+      for amt in { abs( amt ) for amt in amounts }:
+        for tx in self.transfers_by_amt.get( amt, [] ) + self.transfers_by_amt.get( -amt, [] ):
+          tx.matched_transfer = False
+        if amt in self.transfers_by_amt:
+          pending.append( ( amt, self.transfers_by_amt[ amt ] ) )
+
+    for amt, transfers in pending:
+      if amt == 0:
+        MatchZeroTransfers( transfers, date_window, one_to_one )
+        continue
+
+      opposites = self.transfers_by_amt.get( -amt )
+      if amt < 0 or opposites is None:
+        continue
+
+      if one_to_one:
+        PairTransfers( transfers, opposites, date_window )
+      else:
+        MatchTransfersInWindow( transfers, opposites, date_window )
+        MatchTransfersInWindow( opposites, transfers, date_window )
+
+#------------------------------------------------------------------------------------------------
+# Matches transfers and credit card payments across all statements in one pass
+def ResolveTransfers( statements : List[Statement], date_window : Optional[timedelta] = None, one_to_one : bool = False ) -> None:
+  transfer_index = TransferIndex()
+  for stmt in statements:
+    for tx in stmt.transactions:
+      transfer_index.Add( tx )
+  transfer_index.Resolve( date_window, one_to_one )
+
+
+#------------------------------------------------------------------------------------------------
+def NormalizeName( name : str ) -> str:
+  return ' '.join( name.split() ).upper()
+
+#------------------------------------------------------------------------------------------------
+# drops transactions already seen in another statement, as happens when exported date ranges
+#  overlap or a statement is exported twice. A transaction is identified by account, date, amount
+#  and name. The same purchase can legitimately happen twice on one day, so a transaction only
+#  counts as a duplicate once a statement has more copies of it than some earlier statement had.
+#  Returns the number of transactions dropped
+def RemoveDuplicateTransactions( statements : List[Statement] ) -> int:
+  most_seen : Dict[ Tuple, int ] = {} # most copies of a transaction found in any one statement so far
+  removed   = 0
+  for stmt in statements:
+    account_key = ( stmt.bank_info.bank, stmt.account.id )
+    seen : Dict[ Tuple, int ] = {}
+    keep : List[bool] = []
+    for tx in stmt.transactions:
+      fingerprint = ( account_key, tx.date, tx.amount.AsCents(), NormalizeName( tx.name ) )
+      count = seen.get( fingerprint, 0 ) + 1
+      seen[ fingerprint ] = count
+      keep.append( count > most_seen.get( fingerprint, 0 ) )
+
+    for fingerprint, count in seen.items():
+      if count > most_seen.get( fingerprint, 0 ):
+        most_seen[ fingerprint ] = count
+
+    if not all( keep ):
+      removed += keep.count( False )
+      if isinstance( stmt.transactions, TransactionTable ):
+        stmt.transactions.Keep( keep )
+      else:
+        stmt.transactions = [ tx for tx, kept in zip( stmt.transactions, keep ) if kept ]
+  return removed
+
+#------------------------------------------------------------------------------------------------
+# first and last day of period `key`, where periods are `period_months` months long counting from
+#  January of year 0, so 3 gives calendar quarters and 12 gives years
+def PeriodBounds( key : int, period_months : int ) -> Tuple[ datetime, datetime ]:
+  first_month = key * period_months
+  next_month  = first_month + period_months
+  start_date  = datetime( first_month // 12, first_month % 12 + 1, 1 )
+  end_date    = datetime( next_month // 12, next_month % 12 + 1, 1 ) - timedelta( days=1 )
+  return start_date, end_date
+
+# Splits statements into periods of `period_months` months in a single pass over their
+#  transactions sorted by date. Each period gets one statement for every account that has
+#  transactions in it, dated to the whole period. They share the original statement's account and
+#  Transactions, or copy rows into a table of their own for columnar statements, so categories
+#  and matched transfers carry over as they are. Periods come back in date order
+def PartitionByPeriod( statements : List[ Statement ], period_months : int = 1 ) -> List[ List[ Statement ] ]:
+  dated = [ ( tx.date, stmt_idx, tx ) for stmt_idx, stmt in enumerate( statements ) for tx in stmt.transactions ]
+  dated.sort( key=lambda entry : entry[0] )
+
+  periods     : List[ Dict[ int, Statement ] ] = []
+  current_key = None
+  for date, stmt_idx, tx in dated:
+    key = ( date.year * 12 + date.month - 1 ) // period_months
+    if key != current_key:
+      current_key = key
+      bounds      = PeriodBounds( key, period_months )
+      periods.append( {} )
+
+    period_stmt = periods[-1].get( stmt_idx )
+    if period_stmt is None:
+      stmt        = statements[ stmt_idx ]
+      period_stmt = Statement( stmt.bank_info, isinstance( stmt.transactions, TransactionTable ) )
+      period_stmt.account     = stmt.account
+      period_stmt.source_path = stmt.source_path
+      period_stmt.start_date, period_stmt.end_date = bounds
+      periods[-1][ stmt_idx ] = period_stmt
+    period_stmt.transactions.append( tx )
 
-    with open( statement_path, 'r' ) as statement_file:
-
-      # get account info
-      if self.bank_info.account_id_pattern is not None:
-        m = re.match( self.bank_info.account_id_pattern, file_basename )
-        if m is not None:
-          self.account.id = int( m.group(1) )
-
-      statement_csv = csv.reader( statement_file )
-
-      next( statement_csv ) # skip the header
-      for row in statement_csv:
-        amount   = USD.FromString( row[ self.bank_info.amount_idx ] )
-        date     = datetime.strptime( row[ self.bank_info.date_idx ], self.bank_info.date_fmt )
-        name     = row[ self.bank_info.name_idx ]
-        category = categorizer.GetCategoryForName( name )
-        is_debt  = self.account.bank_info.type == BankType.CreditCard or category == 'Loans'
-        transaction = Transaction( name, amount, self.account, date, category, is_debt )
-        self.transactions.append( transaction )
-
-        if self.start_date is None or self.start_date > date:
-          self.start_date = date
-
-        if self.end_date is None or self.end_date < date:
-          self.end_date = date
-        
-      # extract general info about statement (account, start/end date if available)
-      if self.bank_info.date_begin_pattern is not None:
-        inferred_date = self.bank_info.date_begin_pattern.Match( file_basename, 'start date', self.bank_info.bank.name )
-        if inferred_date is not None:
-          self.start_date = inferred_date
-
-      if self.bank_info.date_end_pattern is not None:
-        inferred_date = self.bank_info.date_end_pattern.Match( file_basename, 'end date', self.bank_info.bank.name )
-        if inferred_date is not None:
-          self.end_date = inferred_date
-
-  def ResolveTransfers( self, statements ) -> None:
-    for stmt in statements:
-      stmt_tx_amts = [ tx.amount for tx in stmt.transactions if tx.category == 'Transfer' or tx.category == 'Credit Card Payment' ]
-      for tx in [ tx for tx in self.transactions if tx.category == 'Transfer' or tx.category == 'Credit Card Payment' ]:
-        if -tx.amount in stmt_tx_amts:
-          tx.matched_transfer = True
+  return [ [ period[ stmt_idx ] for stmt_idx in sorted( period.keys() ) ] for period in periods ]
\ No newline at end of file
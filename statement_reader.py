@@ -0,0 +1,117 @@
+import io
+import os
+import profiling
+from typing import Optional, List, Dict, Tuple
+from datetime import timedelta
+from statement import Statement, Categorizer, ResolveTransfers, RemoveDuplicateTransactions
+from bank      import BankManager
+from manifest  import StatementManifest, HashBytes
+
+#------------------------------------------------------------------------------------------------
+# the file is opened once, the header identifies the bank and parsing carries on from there.
+#  If the file's contents were already read (see prefetch.py), they're parsed instead
+def ReadStatementFile( statement_full_path : str, bank_manager : BankManager, categorizer : Categorizer, columnar : bool = False, contents : Optional[bytes] = None, batch : bool = False ) -> Optional[ Statement ]:
+  with ( open( statement_full_path, 'r' ) if contents is None else io.TextIOWrapper( io.BytesIO( contents ) ) ) as statement_file:
+    bank_info = bank_manager.IdentifyHeader( statement_file.readline() )
+    if bank_info is None:
+      return None
+    statement = Statement( bank_info, columnar )
+    statement.Read( statement_full_path, categorizer, statement_file, batch )
+  return statement
+
+#------------------------------------------------------------------------------------------------
+# config for statement worker processes. It's handed over once per worker when the pool starts
+#  rather than once per file, and never re-read from yaml
+g_WorkerBankManager : Optional[ BankManager ] = None
+g_WorkerCategorizer : Optional[ Categorizer ] = None
+g_WorkerColumnar    : bool                    = False
+g_WorkerBatch       : bool                    = False
+g_WorkerHash        : bool                    = False
+
+def InitStatementWorker( bank_manager : BankManager, categorizer : Categorizer, columnar : bool, batch : bool, hash_contents : bool ) -> None:
+  global g_WorkerBankManager, g_WorkerCategorizer, g_WorkerColumnar, g_WorkerBatch, g_WorkerHash
+  g_WorkerBankManager = bank_manager
+  g_WorkerCategorizer = categorizer
+  g_WorkerColumnar    = columnar
+  g_WorkerBatch       = batch
+  g_WorkerHash        = hash_contents
+
+# returns the statement along with the names the worker categorized for the first time, so the
+#  category cache still learns them, and the hash of the file for the manifest if asked for
+def ReadStatementInWorker( statement_full_path : str ) -> Tuple[ Optional[ Statement ], Dict[ str, str ], Optional[str] ]:
+  contents  = ReadContents( statement_full_path, g_WorkerHash )
+  statement = ReadStatementFile( statement_full_path, g_WorkerBankManager, g_WorkerCategorizer, g_WorkerColumnar, contents, g_WorkerBatch )
+  new_names = g_WorkerCategorizer.new_names
+  g_WorkerCategorizer.new_names = {}
+  return statement, new_names, HashBytes( contents ) if contents is not None else None
+
+# with a manifest, a statement is read into memory so the same bytes are parsed and hashed,
+#  instead of the file being read a second time to hash it
+def ReadContents( statement_full_path : str, for_manifest : bool ) -> Optional[bytes]:
+  if not for_manifest:
+    return None
+  from prefetch import ReadFileBytes
+  return ReadFileBytes( statement_full_path )
+
+#------------------------------------------------------------------------------------------------
+def ReadStatements( path_to_statements : str, bank_manager : BankManager, categorizer : Categorizer, transfer_window : Optional[timedelta] = None, pair_transfers : bool = False, jobs : int = 1, manifest : Optional[ StatementManifest ] = None, columnar : bool = False, dedup : bool = False, prefetch : int = 0, batch : bool = False ) -> List[ Statement ]:
+  statement_file_list = sorted( os.listdir( path_to_statements ) )
+  statement_paths     = [ f'{path_to_statements}\\{file}' for file in statement_file_list ]
+
+  # statements the manifest already has are rebuilt from it, only the rest are parsed
+  read_statements : List[ Optional[ Statement ] ] = [ None ] * len( statement_paths )
+  unread_idxs     : List[ int ] = []
+  for idx, statement_full_path in enumerate( statement_paths ):
+    entry = manifest.Lookup( statement_full_path ) if manifest is not None else None
+    if entry is not None:
+      read_statements[ idx ] = entry.ToStatement( statement_full_path, bank_manager, columnar )
+    else:
+      unread_idxs.append( idx )
+
+  if jobs > 1 and len( unread_idxs ) > 1:
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor( max_workers=jobs, initializer=InitStatementWorker, initargs=( bank_manager, categorizer, columnar, batch, manifest is not None ) ) as executor:
+      unread_paths = [ statement_paths[ idx ] for idx in unread_idxs ]
+      for idx, ( statement, new_names, content_hash ) in zip( unread_idxs, executor.map( ReadStatementInWorker, unread_paths ) ):
+        if statement is not None:
+          # workers hand back copies of the bank config, point them back at ours
+          bank_info = bank_manager.banks[ statement.bank_info.bank ]
+          statement.bank_info         = bank_info
+          statement.account.bank_info = bank_info
+        categorizer.new_names.update( new_names )
+        read_statements[ idx ] = statement
+        if manifest is not None:
+          manifest.Record( statement_paths[ idx ], statement, content_hash=content_hash )
+  elif prefetch > 0:
+    from prefetch import StatementPrefetcher
+    unread_paths = [ statement_paths[ idx ] for idx in unread_idxs ]
+    for idx, ( statement_full_path, contents ) in zip( unread_idxs, StatementPrefetcher( unread_paths, prefetch ) ):
+      with profiling.Stage( os.path.basename( statement_full_path ) ):
+        read_statements[ idx ] = ReadStatementFile( statement_full_path, bank_manager, categorizer, columnar, contents, batch )
+      if manifest is not None:
+        manifest.Record( statement_full_path, read_statements[ idx ], contents )
+  else:
+    for idx in unread_idxs:
+      statement_full_path = statement_paths[ idx ]
+      with profiling.Stage( os.path.basename( statement_full_path ) ):
+        contents = ReadContents( statement_full_path, manifest is not None )
+        read_statements[ idx ] = ReadStatementFile( statement_full_path, bank_manager, categorizer, columnar, contents, batch )
+      if manifest is not None:
+        manifest.Record( statement_full_path, read_statements[ idx ], contents )
+
+  if manifest is not None:
+    manifest.Prune( statement_paths )
+
+  statements : List[ Statement ] = [ statement for statement in read_statements if statement is not None ]
+
+  # duplicates have to go before transfers are matched, or they'd match each other's opposites
+  if dedup:
+    with profiling.Stage( 'dedup' ):
+      removed = RemoveDuplicateTransactions( statements )
+    if removed > 0:
+      print( f'Dropped {removed} duplicate transactions from overlapping statements' )
+
+  with profiling.Stage( 'resolve transfers' ):
+    ResolveTransfers( statements, transfer_window, pair_transfers )
+
+  return statements
\ No newline at end of file
@@ -0,0 +1,216 @@
+import os
+import time
+from datetime import timedelta
+from typing import Optional, List, Dict, Tuple, Set, TYPE_CHECKING
+import profiling
+from bank      import BankManager, PrintWarning
+from manifest  import StatementManifest
+from statement import Statement, Transaction, Categorizer, TransferIndex, RemoveDuplicateTransactions
+from statement_reader import ReadStatements, ReadStatementFile, ReadContents
+
+if TYPE_CHECKING:
+  from workbook_maker    import WorkbookMaker
+  from transaction_store import TransactionStore
+
+#------------------------------------------------------------------------------------------------
+def CopyStatement( statement : Statement, columnar : bool ) -> Statement:
+  copy = Statement( statement.bank_info, columnar )
+  copy.account.id  = statement.account.id
+  copy.start_date  = statement.start_date
+  copy.end_date    = statement.end_date
+  copy.source_path = statement.source_path
+  for tx in statement.transactions:
+    copy.transactions.append( Transaction( tx.name, tx.amount, copy.account, tx.date, tx.category, tx.is_debt ) )
+  return copy
+
+# what a statement's rows in the store hold
+def StatementRows( statement : Statement ) -> List[ Tuple ]:
+  return [ ( tx.date, tx.amount.AsCents(), tx.name, tx.category, tx.is_debt, tx.matched_transfer ) for tx in statement.transactions ]
+
+#------------------------------------------------------------------------------------------------
+# Keeps the config, every parsed statement and the open workbook in memory, and polls the
+#  statements directory for files that were added, changed or removed. A file is only read once
+#  it's the same size and mtime on two polls in a row, so half-copied files aren't parsed. Only
+#  the transfers with the same amounts as the ones that came or went are matched again. The
+#  workbook is rewritten once no files have changed for `debounce` seconds. A file that can't be
+#  read, and a workbook that can't be saved, are warned about and tried again on a later poll.
+# With dedup, which transactions are duplicates depends on every statement, so each change
+#  dedups and matches transfers over copies of all the parsed statements instead
+class StatementWatcher:
+  path_to_statements : str
+  bank_manager       : BankManager
+  categorizer        : Categorizer
+  book_maker         : 'WorkbookMaker'
+  transfer_window    : Optional[timedelta]
+  pair_transfers     : bool
+  columnar           : bool
+  dedup              : bool
+  manifest           : Optional[ StatementManifest ]
+  store              : Optional[ 'TransactionStore' ]
+  batch              : bool
+  stamps             : Dict[ str, Tuple[ int, int ] ]  # size and mtime of every file read so far
+  pending            : Dict[ str, Tuple[ int, int ] ]  # files that changed on the last poll
+  statements         : Dict[ str, Statement ]
+  transfer_index     : TransferIndex
+  output             : List[ Statement ]               # what goes in the workbook
+  changed_paths      : Set[str]                        # read, removed or rematched since the last write
+  last_change        : Optional[float]
+  worksheet_name     : Optional[str]
+
+  def __init__( self, path_to_statements : str, bank_manager : BankManager, categorizer : Categorizer, book_maker, transfer_window : Optional[timedelta] = None,
+                pair_transfers : bool = False, columnar : bool = False, dedup : bool = False, manifest : Optional[ StatementManifest ] = None, store = None, batch : bool = False ) -> None:
+    self.path_to_statements = path_to_statements
+    self.bank_manager       = bank_manager
+    self.categorizer        = categorizer
+    self.book_maker         = book_maker
+    self.transfer_window    = transfer_window
+    self.pair_transfers     = pair_transfers
+    self.columnar           = columnar
+    self.dedup              = dedup
+    self.manifest           = manifest
+    self.store              = store
+    self.batch              = batch
+    self.stamps             = {}
+    self.pending            = {}
+    self.statements         = {}
+    self.transfer_index     = TransferIndex()
+    self.output             = []
+    self.changed_paths      = set()
+    self.last_change        = None
+    self.worksheet_name     = None
+
+  def Scan( self ) -> Dict[ str, Tuple[ int, int ] ]:
+    stamps = {}
+    for entry in os.scandir( self.path_to_statements ):
+      try:
+        if not entry.is_file():
+          continue
+        stat = entry.stat()
+      except OSError:
+        continue # removed since the directory was listed
+      stamps[ f'{self.path_to_statements}\\{entry.name}' ] = ( stat.st_size, stat.st_mtime_ns )
+    return stamps
+
+  # the first import, which reads everything (through the manifest and worker processes if given)
+  def Start( self, jobs : int = 1 ) -> None:
+    self.stamps = self.Scan()
+    for statement in ReadStatements( self.path_to_statements, self.bank_manager, self.categorizer, self.transfer_window, self.pair_transfers, jobs, self.manifest, self.columnar, batch=self.batch ):
+      self.statements[ statement.source_path ] = statement
+      # ReadStatements already matched the transfers
+      self.transfer_index.AddStatement( statement, reset=False )
+    self.changed_paths = set( self.stamps.keys() )
+    self.Update( set() )
+    self.Write()
+
+  def Poll( self ) -> None:
+    stamps  = self.Scan()
+    removed = [ path for path in self.stamps.keys() if path not in stamps ]
+    changed = [ path for path, stamp in stamps.items() if self.stamps.get( path ) != stamp ]
+    ready   = [ path for path in changed if self.pending.get( path ) == stamps[ path ] ]
+    self.pending = { path : stamps[ path ] for path in changed if path not in ready }
+
+    # a file that's locked, gone or malformed stays pending, so it's read again on the next poll.
+    #  Until then the version read before (if any) is kept
+    read : Dict[ str, Optional[ Statement ] ] = {}
+    for path in ready:
+      try:
+        with profiling.Stage( os.path.basename( path ) ):
+          contents     = ReadContents( path, self.manifest is not None )
+          read[ path ] = ReadStatementFile( path, self.bank_manager, self.categorizer, self.columnar, contents, self.batch )
+        if self.manifest is not None:
+          self.manifest.Record( path, read[ path ], contents )
+      except ( OSError, ValueError, IndexError ) as error:
+        read.pop( path, None )
+        self.pending[ path ] = stamps[ path ]
+        PrintWarning( f'could not read {os.path.basename( path )}, trying again on the next poll: {error}' )
+    ready = list( read.keys() )
+    if len( removed ) == 0 and len( ready ) == 0:
+      return
+
+    amounts : Set[int] = set()
+    for path in removed + ready:
+      statement = self.statements.pop( path, None )
+      if statement is not None:
+        amounts |= self.transfer_index.RemoveStatement( statement )
+      self.stamps.pop( path, None )
+
+    for path, statement in read.items():
+      if statement is not None:
+        self.statements[ path ] = statement
+        amounts |= self.transfer_index.AddStatement( statement )
+      self.stamps[ path ] = stamps[ path ]
+      print( f'{"Read" if statement is not None else "Skipped"} {os.path.basename( path )}' )
+
+    for path in removed:
+      print( f'Removed {os.path.basename( path )}' )
+    if self.manifest is not None and len( removed ) > 0:
+      self.manifest.Prune( self.stamps.keys() )
+
+    self.changed_paths.update( removed + ready )
+    self.last_change = time.monotonic()
+    self.Update( amounts )
+
+  # brings transfer matches (and dedup) up to date after statements came or went. Statements that
+  #  weren't read again can still change, so they're marked for the store too
+  def Update( self, amounts : Set[int] ) -> None:
+    statements = [ self.statements[ path ] for path in sorted( self.statements.keys() ) ]
+    if self.dedup:
+      previous    = { statement.source_path : StatementRows( statement ) for statement in self.output }
+      self.output = [ CopyStatement( statement, self.columnar ) for statement in statements ]
+      RemoveDuplicateTransactions( self.output )
+      transfer_index = TransferIndex()
+      for statement in self.output:
+        transfer_index.AddStatement( statement )
+      transfer_index.Resolve( self.transfer_window, self.pair_transfers )
+      self.changed_paths.update( statement.source_path for statement in self.output if previous.get( statement.source_path ) != StatementRows( statement ) )
+    else:
+      self.output = statements
+      resolved    = [ tx for amt in { abs( amt ) for amt in amounts } for tx in self.transfer_index.transfers_by_amt.get( amt, [] ) + self.transfer_index.transfers_by_amt.get( -amt, [] ) ]
+      matched     = [ tx.matched_transfer for tx in resolved ]
+      self.transfer_index.Resolve( self.transfer_window, self.pair_transfers, amounts )
+      accounts    = { id( tx.account ) for tx, was_matched in zip( resolved, matched ) if tx.matched_transfer != was_matched }
+      self.changed_paths.update( statement.source_path for statement in statements if id( statement.account ) in accounts )
+
+  def Write( self ) -> None:
+    if len( self.output ) > 0:
+      with profiling.Stage( 'append statements' ):
+        worksheet_name = self.book_maker.AppendStatements( self.output, self.categorizer )
+      if self.worksheet_name is not None and self.worksheet_name != worksheet_name:
+        self.book_maker.RemovePeriodSheet( self.worksheet_name )
+      self.worksheet_name = worksheet_name
+    elif self.worksheet_name is not None:
+      self.book_maker.RemovePeriodSheet( self.worksheet_name )
+      self.worksheet_name = None
+
+    with profiling.Stage( 'save workbook' ):
+      self.book_maker.Save()
+
+    self.categorizer.SaveCache()
+    if self.manifest is not None:
+      self.manifest.Save()
+    if self.store is not None:
+      removed = [ path for path in self.changed_paths if path not in self.stamps ]
+      if len( removed ) > 0:
+        self.store.RemoveSourceFiles( removed )
+      self.store.AddStatements( [ statement for statement in self.output if statement.source_path in self.changed_paths ] )
+
+    self.changed_paths = set()
+    self.last_change   = None
+
+  def Run( self, poll_interval : float = 2.0, debounce : float = 5.0 ) -> None:
+    print( f'Watching {self.path_to_statements} for new statements, Ctrl+C to stop' )
+    try:
+      while True:
+        time.sleep( poll_interval )
+        self.Poll()
+        if self.last_change is not None and time.monotonic() - self.last_change >= debounce:
+          # e.g. the workbook is open in Excel, last_change is left set so saving is tried again
+          try:
+            self.Write()
+          except OSError as error:
+            PrintWarning( f'could not save the workbook, trying again after the next poll: {error}' )
+            continue
+          print( f'Saved {len( self.output )} statements' )
+    except KeyboardInterrupt:
+      if self.last_change is not None:
+        self.Write()
\ No newline at end of file
@@ -0,0 +1,47 @@
+import random
+import re
+import unittest
+from typing import List, Optional, Pattern, Tuple
+from statement import CategoryMatcher
+
+#------------------------------------------------------------------------------------------------
+# the first rule, in config order, that matches anywhere in the name
+def MatchSequential( rules : List[Tuple[str, Pattern]], name : str ) -> Optional[str]:
+  for category, pattern in rules:
+    if pattern.search( name ) is not None:
+      return category
+  return None
+
+def RandomRule( rng : random.Random ) -> str:
+  word  = ''.join( rng.choice( 'ab' ) for _ in range( rng.randint( 1, 3 ) ) )
+  group = f'g{rng.randint( 0, 9 )}'
+  return rng.choice( [ word,
+                       f'{word}.*b',
+                       f'^{word}',
+                       f'{word}$',
+                       f'({word})\\1',
+                       f'(?P<{group}>{word})(?P={group})',
+                       f'({word})?(?(1)b|a)',
+                       f'(?i){word.upper()}',
+                       f'\\\\1{word}' ] )
+
+#------------------------------------------------------------------------------------------------
+class TestCategoryMatcher( unittest.TestCase ):
+  def assertSequential( self, rules : List[Tuple[str, Pattern]], names : List[str] ) -> None:
+    matcher = CategoryMatcher( rules )
+    for name in names:
+      self.assertEqual( matcher.Match( name ), MatchSequential( rules, name ), ( [ p.pattern for _, p in rules ], name ) )
+
+  def test_backreferences( self ) -> None:
+    rules = [ ( 'A', re.compile( r'(a)\1' ) ), ( 'B', re.compile( r'(b)\1' ) ), ( 'C', re.compile( r'(?P<x>c)(?P=x)' ) ), ( 'D', re.compile( r'd.*' ) ) ]
+    self.assertSequential( rules, [ 'aa', 'bb', 'cc', 'ab', 'xbbx', 'dbb', 'bbd', '' ] )
+
+  def test_random_rules( self ) -> None:
+    rng = random.Random( 1234 )
+    for _ in range( 300 ):
+      rules = [ ( f'Category {i}', re.compile( RandomRule( rng ) ) ) for i in range( rng.randint( 1, 8 ) ) ]
+      names = [ ''.join( rng.choice( 'abAB\\1' ) for _ in range( rng.randint( 0, 6 ) ) ) for _ in range( 30 ) ]
+      self.assertSequential( rules, names )
+
+if __name__ == '__main__':
+  unittest.main()
\ No newline at end of file
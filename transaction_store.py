@@ -0,0 +1,135 @@
+import sqlite3
+from datetime import datetime
+from typing import List, Dict, Tuple, Iterable
+from bank      import Bank, BankManager, DateParser
+from currency  import USD
+from statement import Statement, Transaction
+
+g_StoreSchema = '''
+CREATE TABLE IF NOT EXISTS statements (
+  source_file TEXT PRIMARY KEY,
+  bank        TEXT NOT NULL,
+  account_id  INTEGER NOT NULL,
+  start_date  TEXT,
+  end_date    TEXT
+);
+CREATE TABLE IF NOT EXISTS transactions (
+  id               INTEGER PRIMARY KEY,
+  bank             TEXT NOT NULL,
+  account_id       INTEGER NOT NULL,
+  account          TEXT NOT NULL,
+  date             TEXT NOT NULL,
+  cents            INTEGER NOT NULL,
+  name             TEXT NOT NULL,
+  category         TEXT NOT NULL,
+  matched_transfer INTEGER NOT NULL,
+  is_debt          INTEGER NOT NULL,
+  source_file      TEXT
+);
+CREATE INDEX IF NOT EXISTS transactions_date        ON transactions ( date );
+CREATE INDEX IF NOT EXISTS transactions_account     ON transactions ( account, date );
+CREATE INDEX IF NOT EXISTS transactions_category    ON transactions ( category, date );
+CREATE INDEX IF NOT EXISTS transactions_source_file ON transactions ( source_file );
+'''
+
+g_StoreDateFmt = '%Y-%m-%d'
+
+#------------------------------------------------------------------------------------------------
+# Transactions for ( bank, account_id, date, cents, name, category, matched_transfer, is_debt )
+#  rows, in row order, and the statements (one per account) holding them. Each distinct date is
+#  only parsed once
+def TransactionsFromRows( rows : Iterable[ Tuple ], bank_manager : BankManager, columnar : bool = False ) -> Tuple[ List[ Transaction ], List[ Statement ] ]:
+  transactions : List[ Transaction ] = []
+  statements   : Dict[ Tuple[ str, int ], Statement ] = {}
+  parsed_dates : Dict[ str, datetime ] = {}
+  date_parser  = DateParser( g_StoreDateFmt )
+  for bank_name, account_id, date, cents, name, category, matched_transfer, is_debt in rows:
+    statement = statements.get( ( bank_name, account_id ) )
+    if statement is None:
+      statement = Statement( bank_manager.banks[ Bank[ bank_name ] ], columnar )
+      statement.account.id = account_id
+      statements[ ( bank_name, account_id ) ] = statement
+
+    tx_date = parsed_dates.get( date )
+    if tx_date is None:
+      tx_date = date_parser( date )
+      parsed_dates[ date ] = tx_date
+
+    tx = Transaction( name, USD( cents ), statement.account, tx_date, category, bool( is_debt ) )
+    tx.matched_transfer = bool( matched_transfer )
+    statement.transactions.append( tx )
+    transactions.append( tx )
+
+  return transactions, list( statements.values() )
+
+#------------------------------------------------------------------------------------------------
+# Every imported transaction in a local SQLite database, so periods can be rebuilt or analyzed
+#  without going back to the statement files. Dates are stored as ISO text so they sort and
+#  compare correctly and work with SQLite's date functions. Re-adding a statement file replaces
+#  whatever was stored for it before
+class TransactionStore:
+  path       : str
+  connection : sqlite3.Connection
+
+  def __init__( self, path : str ) -> None:
+    self.path       = path
+    self.connection = sqlite3.connect( path )
+    self.connection.executescript( g_StoreSchema )
+
+  def Close( self ) -> None:
+    self.connection.close()
+
+  def AddStatements( self, statements : List[ Statement ] ) -> None:
+    with self.connection:
+      for stmt in statements:
+        if stmt.source_path is not None:
+          self.connection.execute( 'DELETE FROM transactions WHERE source_file = ?', ( stmt.source_path, ) )
+          self.connection.execute( 'INSERT OR REPLACE INTO statements VALUES ( ?, ?, ?, ?, ? )',
+                                   ( stmt.source_path,
+                                     stmt.bank_info.bank.name,
+                                     stmt.account.id,
+                                     stmt.start_date.strftime( g_StoreDateFmt ) if stmt.start_date is not None else None,
+                                     stmt.end_date.strftime( g_StoreDateFmt ) if stmt.end_date is not None else None ) )
+
+        account_name = str( stmt.account )
+        self.connection.executemany( 'INSERT INTO transactions ( bank, account_id, account, date, cents, name, category, matched_transfer, is_debt, source_file ) VALUES ( ?, ?, ?, ?, ?, ?, ?, ?, ?, ? )',
+                                     ( ( stmt.bank_info.bank.name,
+                                         stmt.account.id,
+                                         account_name,
+                                         tx.date.strftime( g_StoreDateFmt ),
+                                         tx.amount.AsCents(),
+                                         tx.name,
+                                         tx.category,
+                                         int( tx.matched_transfer ),
+                                         int( tx.is_debt ),
+                                         stmt.source_path ) for tx in stmt.transactions ) )
+
+  def RemoveSourceFiles( self, source_paths : List[str] ) -> None:
+    with self.connection:
+      self.connection.executemany( 'DELETE FROM transactions WHERE source_file = ?', ( ( path, ) for path in source_paths ) )
+      self.connection.executemany( 'DELETE FROM statements WHERE source_file = ?', ( ( path, ) for path in source_paths ) )
+
+  # One statement per account holding its transactions between start_date and end_date inclusive,
+  #  dated with that range so they make up exactly that period's sheet
+  def QueryStatements( self, bank_manager : BankManager, start_date : datetime, end_date : datetime, columnar : bool = False ) -> List[ Statement ]:
+    cursor = self.connection.execute( 'SELECT bank, account_id, date, cents, name, category, matched_transfer, is_debt FROM transactions '
+                                      'WHERE date BETWEEN ? AND ? ORDER BY bank, account_id, date, id',
+                                      ( start_date.strftime( g_StoreDateFmt ), end_date.strftime( g_StoreDateFmt ) ) )
+
+    _, statements = TransactionsFromRows( cursor, bank_manager, columnar )
+    for statement in statements:
+      statement.start_date = start_date
+      statement.end_date   = end_date
+    return statements
+
+  # every stored transaction along with its row id
+  def QueryAll( self, bank_manager : BankManager ) -> List[ Tuple[ int, Transaction ] ]:
+    rows = self.connection.execute( 'SELECT id, bank, account_id, date, cents, name, category, matched_transfer, is_debt FROM transactions ORDER BY id' ).fetchall()
+    transactions, _ = TransactionsFromRows( ( row[ 1: ] for row in rows ), bank_manager )
+    return [ ( row[0], tx ) for row, tx in zip( rows, transactions ) ]
+
+  # writes back the category and flags of transactions read with QueryAll
+  def UpdateTransactions( self, rows : List[ Tuple[ int, Transaction ] ] ) -> None:
+    with self.connection:
+      self.connection.executemany( 'UPDATE transactions SET category = ?, matched_transfer = ?, is_debt = ? WHERE id = ?',
+                                   ( ( tx.category, int( tx.matched_transfer ), int( tx.is_debt ), row_id ) for row_id, tx in rows ) )
\ No newline at end of file
@@ -0,0 +1,180 @@
+from array import array
+from datetime import datetime
+from typing import List, Dict, Iterable, Iterator
+from currency import USD
+
+g_MatchedTransferFlag = 0x1
+g_IsDebtFlag          = 0x2
+
+#------------------------------------------------------------------------------------------------
+# Transactions stored column by column: amounts as int cents, dates as ordinals, names and
+#  categories as ids into a shared string pool, accounts as ids and the two booleans as bit flags.
+#  Rows are handed out as TransactionViews, which read and write the columns, so code written
+#  against Transaction (tx.amount, tx.date, tx.matched_transfer = True, ...) works unchanged.
+#  It behaves like the list of transactions a Statement normally holds (append, extend, len,
+#  indexing, iteration).
+class TransactionTable:
+  cents        : array
+  dates        : array
+  name_ids     : array
+  category_ids : array
+  account_ids  : array
+  flags        : bytearray
+  strings      : List[str]
+  string_ids   : Dict[ str, int ]
+  accounts     : List
+  account_idxs : Dict[ int, int ]
+
+  def __init__( self, transactions : Iterable = () ) -> None:
+    self.cents        = array( 'q' )
+    self.dates        = array( 'l' )
+    self.name_ids     = array( 'L' )
+    self.category_ids = array( 'L' )
+    self.account_ids  = array( 'L' )
+    self.flags        = bytearray()
+    self.strings      = []
+    self.string_ids   = {}
+    self.accounts     = []
+    self.account_idxs = {}
+    self.extend( transactions )
+
+  # accounts are looked up by identity, which doesn't survive pickling
+  def __getstate__( self ):
+    state = self.__dict__.copy()
+    del state[ 'account_idxs' ]
+    return state
+
+  def __setstate__( self, state ) -> None:
+    self.__dict__.update( state )
+    self.account_idxs = { id( account ) : account_id for account_id, account in enumerate( self.accounts ) }
+
+  def StringId( self, string : str ) -> int:
+    string_id = self.string_ids.get( string )
+    if string_id is None:
+      string_id = len( self.strings )
+      self.strings.append( string )
+      self.string_ids[ string ] = string_id
+    return string_id
+
+  def AccountId( self, account ) -> int:
+    account_id = self.account_idxs.get( id( account ) )
+    if account_id is None:
+      account_id = len( self.accounts )
+      self.accounts.append( account )
+      self.account_idxs[ id( account ) ] = account_id
+    return account_id
+
+  def Append( self, name : str, amount : USD, account, date : datetime, category : str, is_debt : bool, matched_transfer : bool = False ) -> None:
+    self.cents.append( amount.AsCents() )
+    self.dates.append( date.toordinal() )
+    self.name_ids.append( self.StringId( name ) )
+    self.category_ids.append( self.StringId( category ) )
+    self.account_ids.append( self.AccountId( account ) )
+    self.flags.append( ( g_MatchedTransferFlag if matched_transfer else 0 ) | ( g_IsDebtFlag if is_debt else 0 ) )
+
+  def append( self, tx ) -> None:
+    self.Append( tx.name, tx.amount, tx.account, tx.date, tx.category, tx.is_debt, tx.matched_transfer )
+
+  def extend( self, transactions : Iterable ) -> None:
+    for tx in transactions:
+      self.append( tx )
+
+  # appends whole columns at once, each one given as the bytes of an array like the one it goes on
+  #  the end of. Name and category ids have to come from StringId, account ids from AccountId
+  def ExtendColumns( self, cents, dates, name_ids, category_ids, account_ids, flags ) -> None:
+    self.cents.frombytes( cents )
+    self.dates.frombytes( dates )
+    self.name_ids.frombytes( name_ids )
+    self.category_ids.frombytes( category_ids )
+    self.account_ids.frombytes( account_ids )
+    self.flags.extend( flags )
+
+  # drops every row whose entry in keep is False
+  def Keep( self, keep : List[bool] ) -> None:
+    self.cents        = array( 'q', [ v for v, k in zip( self.cents,        keep ) if k ] )
+    self.dates        = array( 'l', [ v for v, k in zip( self.dates,        keep ) if k ] )
+    self.name_ids     = array( 'L', [ v for v, k in zip( self.name_ids,     keep ) if k ] )
+    self.category_ids = array( 'L', [ v for v, k in zip( self.category_ids, keep ) if k ] )
+    self.account_ids  = array( 'L', [ v for v, k in zip( self.account_ids,  keep ) if k ] )
+    self.flags        = bytearray( v for v, k in zip( self.flags, keep ) if k )
+
+  def __len__( self ) -> int:
+    return len( self.cents )
+
+  def __getitem__( self, idx : int ):
+    if idx < 0:
+      idx += len( self )
+    if idx < 0 or idx >= len( self ):
+      raise IndexError( idx )
+    return TransactionView( self, idx )
+
+  def __iter__( self ) -> Iterator:
+    for idx in range( len( self ) ):
+      yield TransactionView( self, idx )
+
+#------------------------------------------------------------------------------------------------
+class TransactionView:
+  __slots__ = ( 'table', 'idx' )
+
+  table : TransactionTable
+  idx   : int
+
+  def __init__( self, table : TransactionTable, idx : int ) -> None:
+    self.table = table
+    self.idx   = idx
+
+  @property
+  def name( self ) -> str:
+    return self.table.strings[ self.table.name_ids[ self.idx ] ]
+
+  @property
+  def amount( self ) -> USD:
+    return USD( self.table.cents[ self.idx ] )
+
+  @property
+  def date( self ) -> datetime:
+    return datetime.fromordinal( self.table.dates[ self.idx ] )
+
+  @property
+  def account( self ):
+    return self.table.accounts[ self.table.account_ids[ self.idx ] ]
+
+  @property
+  def category( self ) -> str:
+    return self.table.strings[ self.table.category_ids[ self.idx ] ]
+
+  @category.setter
+  def category( self, category : str ) -> None:
+    self.table.category_ids[ self.idx ] = self.table.StringId( category )
+
+  def GetFlag( self, flag : int ) -> bool:
+    return ( self.table.flags[ self.idx ] & flag ) != 0
+
+  def SetFlag( self, flag : int, value : bool ) -> None:
+    if value:
+      self.table.flags[ self.idx ] |= flag
+    else:
+      self.table.flags[ self.idx ] &= ~flag
+
+  @property
+  def matched_transfer( self ) -> bool:
+    return self.GetFlag( g_MatchedTransferFlag )
+
+  @matched_transfer.setter
+  def matched_transfer( self, matched_transfer : bool ) -> None:
+    self.SetFlag( g_MatchedTransferFlag, matched_transfer )
+
+  @property
+  def is_debt( self ) -> bool:
+    return self.GetFlag( g_IsDebtFlag )
+
+  @is_debt.setter
+  def is_debt( self, is_debt : bool ) -> None:
+    self.SetFlag( g_IsDebtFlag, is_debt )
+
+  def __repr__( self ) -> str:
+    return f'{str(self.account)} : {self.amount} on {self.date}, {self.name}'
+
+  def IsTransfer( self ) -> bool:
+    category = self.category
+    return category == 'Transfer' or category == 'Credit Card Payment'
\ No newline at end of file
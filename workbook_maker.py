@@ -1,224 +1,461 @@
-import math
+import functools
+import os
 import openpyxl
 from openpyxl.worksheet.table import Table, TableStyleInfo
-from typing import List
-import copy
-import pdb
-from statement import Statement, Categorizer
-from bank import BankInfo, BankType
+from typing import List, Dict, Optional, Tuple, Callable
+from datetime import datetime
+import profiling
+from statement import Statement, Transaction, Categorizer, PartitionByPeriod
 
 #------------------------------------------------------------------------------------------------
-class ExcelColumn:
-  name : str
-
-  def __init__( self, name :str ) -> None:
-    self.name = name
-
-  def NameToInt( self, name : str ) -> int:
-    row_idx = 1
-    i = 0
-    for c in name:
-      row_idx += ( ord(c) - 65 ) + i * 26
-      i += 1
-    return row_idx
-  
-  def IntToName( self, i : int ) -> str:
-    name : str = ''
-    while i != 0:
-      name = chr(((i-1) % 26)+65) + name
-      i = math.floor( (i - 1 ) / 26 )
-    return name
-  
-  def __add__( self, num : int ):
-    i_rep = self.NameToInt( self.name )
-    i_rep += num
-    return ExcelColumn( self.IntToName( i_rep ) )
-  
-  def __sub__( self, num : int ):
-    i_rep = self.NameToInt( self.name )
-    i_rep -= num
-    return ExcelColumn( self.IntToName( i_rep ) )
-  
-  def __gt__( self, other ) -> bool:
-    return self.NameToInt( self.name ) > other.NameToInt( other.name )
+# column letters for 1-based column numbers, each one only worked out the first time it's needed
+@functools.lru_cache( maxsize=None )
+def ColumnName( col : int ) -> str:
+  name : str = ''
+  while col != 0:
+    name = chr( ( col - 1 ) % 26 + 65 ) + name
+    col  = ( col - 1 ) // 26
+  return name
 
-  def __repr__( self ) -> str:
-    return self.name
-  
 #------------------------------------------------------------------------------------------------
+# 1-based column and row. The 'A1' address is only built when the cell is turned into a string
 class ExcelCell:
-  col : ExcelColumn
+  __slots__ = ( 'col', 'row' )
+
+  col : int
   row : int
 
-  def __init__( self, col : ExcelColumn, row : int ) -> None:
+  def __init__( self, col : int, row : int ) -> None:
     self.col = col
     self.row = row
 
   def inc_col( self ):
-    ret = ExcelCell( copy.deepcopy( self.col ), self.row )
+    ret = ExcelCell( self.col, self.row )
     self.col += 1
     return ret
 
   def __repr__( self ) -> str:
-    return f'{str(self.col)}{self.row}'
-  
+    return f'{ColumnName( self.col )}{self.row}'
 
 #------------------------------------------------------------------------------------------------
+# steps through a table `width` columns wide, left to right and then down a row
 class ExcelCursor:
-  cell_cursor : ExcelCell
-  cell_begin  : ExcelCell
-  width       : int
+  __slots__ = ( 'first_col', 'last_col', 'col', 'row' )
+
+  first_col : int
+  last_col  : int
+  col       : int
+  row       : int
 
   def __init__( self, cell : ExcelCell, width : int ) -> None:
-    self.cell_begin  = copy.deepcopy( cell )
-    self.cell_cursor = copy.deepcopy( cell )
-    self.width       = width
-  
+    self.first_col = cell.col
+    self.last_col  = cell.col + width - 1
+    self.col       = cell.col
+    self.row       = cell.row
+
+  def Advance( self ) -> None:
+    if self.col < self.last_col:
+      self.col += 1
+    else:
+      self.col  = self.first_col
+      self.row += 1
+
   def inc( self ) -> ExcelCell:
-    ret_cell = copy.deepcopy( self.cell_cursor )
-  
-    cell_end : ExcelCell = ExcelCell( self.cell_begin.col + self.width - 1, self.cell_cursor.row )
-    self.cell_cursor.col += 1
-    if self.cell_cursor.col > cell_end.col:
-      self.cell_cursor.col = copy.deepcopy( self.cell_begin.col )
-      self.cell_cursor.row += 1
-  
+    ret_cell = ExcelCell( self.col, self.row )
+    self.Advance()
     return ret_cell
 
+  # writes value to the cursor's cell and moves on, returns the openpyxl cell written
+  def Write( self, sheet : openpyxl.worksheet.worksheet, value ):
+    cell = sheet.cell( row=self.row, column=self.col )
+    cell.value = value
+    self.Advance()
+    return cell
 
 #------------------------------------------------------------------------------------------------
-class WorkbookMaker:
-  path     : str
-  workbook : openpyxl.Workbook
+# Transactions that are indistinguishable to the summary table, with their amounts added up.
+#  Text is lowercased, since SUMIFS wildcard criteria are case-insensitive
+class SummaryGroup:
+  __slots__ = ( 'account_name', 'category', 'is_debt', 'matched_transfer', 'amount_sign', 'cents' )
+
+  account_name     : str
+  category         : str
+  is_debt          : bool
+  matched_transfer : bool
+  amount_sign      : int
+  cents            : int
+
+  def __init__( self, account_name : str, category : str, is_debt : bool, matched_transfer : bool, amount_sign : int ) -> None:
+    self.account_name     = account_name
+    self.category         = category
+    self.is_debt          = is_debt
+    self.matched_transfer = matched_transfer
+    self.amount_sign      = amount_sign
+    self.cents            = 0
+
+# one pass over every transaction, after which each summary cell only needs to look at the groups
+def SummarizeTransactions( statements : List[ Statement ] ) -> List[ SummaryGroup ]:
+  groups        : Dict[ Tuple, SummaryGroup ] = {}
+  account_names : Dict[ int, str ] = {}
+  for stmt in statements:
+    for tx in stmt.transactions:
+      cents = tx.amount.AsCents()
+      key   = ( id( tx.account ), tx.category, tx.is_debt, tx.matched_transfer, ( cents > 0 ) - ( cents < 0 ) )
+      group = groups.get( key )
+      if group is None:
+        account_name = account_names.get( id( tx.account ) )
+        if account_name is None:
+          account_name = str( tx.account ).lower()
+          account_names[ id( tx.account ) ] = account_name
+        group = SummaryGroup( account_name, tx.category.lower(), tx.is_debt, tx.matched_transfer, key[4] )
+        groups[ key ] = group
+      group.cents += cents
+  return list( groups.values() )
+
+# the value a static summary has for an account's column, or the totals column without one
+def SumAccountGroups( groups : List[ SummaryGroup ], group_filter : Callable[ [ SummaryGroup ], bool ], acct_name : Optional[str] = None ) -> float:
+  if acct_name is None:
+    return SumGroups( groups, group_filter )
+  acct_name = acct_name.lower()
+  return SumGroups( groups, lambda g : acct_name in g.account_name and group_filter( g ) )
+
+def SumGroups( groups : List[ SummaryGroup ], group_filter : Callable[ [ SummaryGroup ], bool ] ) -> float:
+  return sum( group.cents for group in groups if group_filter( group ) ) / 100
 
-  def __init__( self, path ) -> None:
-    self.path     = path
-    self.workbook = openpyxl.load_workbook( path )
+#------------------------------------------------------------------------------------------------
+# Rows of the summary table: the label, then the formula for the totals column and for an account's
+#  column, each with the equivalent filter over SummaryGroups for writing values instead. Note that
+#  the per-account Revenue, Cash Flow and Net Change don't exclude matched transfers
+def SummaryRows( tx_table_name : str, categorizer : Categorizer ) -> List[ Tuple[ str, str, Callable, Callable, Callable ] ]:
+  rows = [
+    ( 'Debt Change',
+      f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Is Debt], "*TRUE*" )',
+      lambda g : g.is_debt,
+      lambda acct : f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Is Debt], "*TRUE*", {tx_table_name}[Account], "*{acct}*")',
+      lambda g : g.is_debt ),
+    ( 'Expenses',
+      f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Amount], "<0", {tx_table_name}[Matched Transfer], "*FALSE*")',
+      lambda g : g.amount_sign < 0 and not g.matched_transfer,
+      lambda acct : f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Amount], "<0", {tx_table_name}[Account], "*{acct}*", {tx_table_name}[Matched Transfer], "*FALSE*")',
+      lambda g : g.amount_sign < 0 and not g.matched_transfer ),
+    ( 'Total Revenue',
+      f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Amount], ">0", {tx_table_name}[Matched Transfer], "*FALSE*" )',
+      lambda g : g.amount_sign > 0 and not g.matched_transfer,
+      lambda acct : f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Amount], ">0", {tx_table_name}[Account], "*{acct}*" )',
+      lambda g : g.amount_sign > 0 ),
+    ( 'Cash Flow',
+      f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Matched Transfer], "*FALSE*", {tx_table_name}[Is Debt], "*FALSE*" )',
+      lambda g : not g.matched_transfer and not g.is_debt,
+      lambda acct : f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Account], "*{acct}*", {tx_table_name}[Is Debt], "*FALSE*")',
+      lambda g : not g.is_debt ),
+    ( 'Net Change',
+      f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Matched Transfer], "*FALSE*" )',
+      lambda g : not g.matched_transfer,
+      lambda acct : f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Account], "*{acct}*" )',
+      lambda g : True ),
+  ]
+
+  for cat in categorizer.categories:
+    cat_lower = cat.lower()
+    rows.append( ( cat,
+                   f'=SUMIFS( {tx_table_name}[Amount], {tx_table_name}[Category], "*{cat}*" )',
+                   lambda g, cat_lower=cat_lower : cat_lower in g.category,
+                   lambda acct, cat=cat : f'=SUMIFS( {tx_table_name}[Amount], {tx_table_name}[Category], "*{cat}*", {tx_table_name}[Account], "*{acct}*" )',
+                   lambda g, cat_lower=cat_lower : cat_lower in g.category ) )
+  return rows
+
+g_IndexSheetName = 'Index'
+g_IndexHeaders   = [ 'Period', 'From', 'To', 'Transactions', 'Net' ]
+
+#------------------------------------------------------------------------------------------------
+class WorkbookMaker:
+  path             : str
+  workbook         : Optional[ openpyxl.Workbook ]
+  period_workbooks : Dict[ str, openpyxl.Workbook ]
+  fast_write       : bool
+  static_summary   : bool
+  split_periods    : bool
+
+  # fast_write writes tables a whole row at a time instead of stepping an ExcelCursor through
+  #  every cell.
+  # static_summary writes the summary totals as values computed here instead of SUMIFS formulas
+  #  that Excel has to recalculate over the whole transaction table.
+  # split_periods treats path as a directory and gives every period its own workbook in it, so an
+  #  import never loads or rewrites the periods it doesn't touch
+  def __init__( self, path, fast_write : bool = False, static_summary : bool = False, split_periods : bool = False ) -> None:
+    self.path             = path
+    self.workbook         = None if split_periods else openpyxl.load_workbook( path )
+    self.period_workbooks = {}
+    self.fast_write       = fast_write
+    self.static_summary   = static_summary
+    self.split_periods    = split_periods
 
   def Save( self ) -> None:
-    self.workbook.save( self.path )
+    if self.split_periods:
+      os.makedirs( self.path, exist_ok=True )
+      for worksheet_name, workbook in self.period_workbooks.items():
+        workbook.save( self.PeriodPath( worksheet_name ) )
+    else:
+      self.workbook.save( self.path )
+
+  def PeriodPath( self, worksheet_name : str ) -> str:
+    return os.path.join( self.path, f'{worksheet_name}.xlsx' )
+
+  # replaces the period's sheet if there already is one
+  def CreatePeriodSheet( self, worksheet_name : str ) -> openpyxl.worksheet.worksheet:
+    if self.split_periods:
+      workbook = openpyxl.Workbook()
+      sheet    = workbook.active
+      sheet.title = worksheet_name
+      self.period_workbooks[ worksheet_name ] = workbook
+      return sheet
+
+    if worksheet_name in self.workbook.sheetnames:
+      self.workbook.remove( self.workbook[ worksheet_name ] )
+    return self.workbook.create_sheet( worksheet_name )
+
+  def RemovePeriodSheet( self, worksheet_name : str ) -> None:
+    if self.split_periods:
+      self.period_workbooks.pop( worksheet_name, None )
+      if os.path.isfile( self.PeriodPath( worksheet_name ) ):
+        os.remove( self.PeriodPath( worksheet_name ) )
+    elif worksheet_name in self.workbook.sheetnames:
+      self.workbook.remove( self.workbook[ worksheet_name ] )
 
-  def AppendStatements( self, new_statements : List[ Statement ], categorizer : Categorizer ) -> None:
+  # One period sheet for every `period_months` months the statements cover (see
+  #  PartitionByPeriod), plus the index sheet. With split_periods and jobs > 1 the period
+  #  workbooks are built and saved by worker processes, since they don't share anything. Returns
+  #  the names of the period sheets
+  def AppendPeriods( self, new_statements : List[ Statement ], categorizer : Categorizer, period_months : int = 1, jobs : int = 1 ) -> List[ str ]:
+    with profiling.Stage( 'partition periods' ):
+      periods = PartitionByPeriod( new_statements, period_months )
+
+    if self.split_periods and jobs > 1 and len( periods ) > 1:
+      from concurrent.futures import ProcessPoolExecutor
+      os.makedirs( self.path, exist_ok=True )
+      with ProcessPoolExecutor( max_workers=jobs, initializer=InitPeriodWorker, initargs=( self.path, self.fast_write, self.static_summary, categorizer ) ) as executor:
+        worksheet_names = list( executor.map( WritePeriodInWorker, periods ) )
+    else:
+      worksheet_names = []
+      for period in periods:
+        with profiling.Stage( period[0].start_date.strftime( '%b %Y' ) ):
+          worksheet_names.append( self.AppendStatements( period, categorizer ) )
+
+    with profiling.Stage( 'index sheet' ):
+      self.UpdateIndex( list( zip( worksheet_names, periods ) ) )
+    return worksheet_names
+
+  # The index lists every period sheet with its dates, transaction count and net amount, linking
+  #  to the sheet (or to its workbook with split_periods). Rows for periods imported before are
+  #  kept as long as their sheet still exists
+  def UpdateIndex( self, periods : List[ Tuple[ str, List[ Statement ] ] ] ) -> None:
+    if self.split_periods:
+      index_path = self.PeriodPath( g_IndexSheetName )
+      workbook   = openpyxl.load_workbook( index_path ) if os.path.isfile( index_path ) else None
+      exists     = lambda name : name in self.period_workbooks or os.path.isfile( self.PeriodPath( name ) )
+      link       = lambda name : f'{name}.xlsx'
+    else:
+      workbook   = self.workbook
+      exists     = lambda name : name in self.workbook.sheetnames
+      link       = lambda name : f"#'{name}'!A1"
+
+    rows : Dict[ str, List ] = {}
+    if workbook is not None and g_IndexSheetName in workbook.sheetnames:
+      for values in workbook[ g_IndexSheetName ].iter_rows( min_row=2, max_col=len( g_IndexHeaders ), values_only=True ):
+        if values[0] is not None and exists( values[0] ):
+          rows[ values[0] ] = list( values )
+
+    for worksheet_name, statements in periods:
+      all_tx = [ tx for stmt in statements for tx in stmt.transactions ]
+      rows[ worksheet_name ] = [ worksheet_name,
+                                 statements[0].start_date.strftime( '%m/%d/%Y' ),
+                                 statements[0].end_date.strftime( '%m/%d/%Y' ),
+                                 len( all_tx ),
+                                 sum( tx.amount.AsCents() for tx in all_tx ) / 100 ]
+
+    if self.split_periods:
+      workbook = openpyxl.Workbook()
+      sheet    = workbook.active
+      sheet.title = g_IndexSheetName
+      self.period_workbooks[ g_IndexSheetName ] = workbook
+    else:
+      if g_IndexSheetName in self.workbook.sheetnames:
+        self.workbook.remove( self.workbook[ g_IndexSheetName ] )
+      sheet = self.workbook.create_sheet( g_IndexSheetName, 0 )
+
+    self.WriteRow( sheet, 1, 1, g_IndexHeaders )
+    for row, values in enumerate( sorted( rows.values(), key=lambda values : datetime.strptime( values[1], '%m/%d/%Y' ) ), 2 ):
+      cells = self.WriteRow( sheet, row, 1, values )
+      cells[0].hyperlink     = link( values[0] )
+      cells[0].style         = 'Hyperlink'
+      cells[4].number_format = "$0.00"
+
+  # returns the name of the period's sheet
+  def AppendStatements( self, new_statements : List[ Statement ], categorizer : Categorizer ) -> str:
     min_start_date = min( [ stmt.start_date for stmt in new_statements ] )
     max_end_date   = max( [ stmt.end_date   for stmt in new_statements ] )
     start_date_str = min_start_date.strftime( '%b%d %Y' )
     end_date_str   = max_end_date.strftime( '%b%d %Y')
 
     worksheet_name = f'{ start_date_str }-{ end_date_str }'
-    if worksheet_name in self.workbook.sheetnames:
-      self.workbook.remove( self.workbook[ worksheet_name ] )
-
-    sheet = self.workbook.create_sheet( worksheet_name )
+    sheet = self.CreatePeriodSheet( worksheet_name )
     simpl_name = worksheet_name.replace(' ', '').replace('-','_')
 
     transaction_table_name = f'{simpl_name}_tx'
-    cell_cursor : ExcelCell = self.MakeSummaryTable( name          = f'{simpl_name}_summary',
-                                                     start_cell    = ExcelCell( ExcelColumn( 'A'), 1 ),
-                                                     sheet         = sheet,
-                                                     tx_table_name = transaction_table_name, 
-                                                     statements    = new_statements,
-                                                     categorizer   = categorizer )
+    with profiling.Stage( 'summary table' ):
+      cell_cursor : ExcelCell = self.MakeSummaryTable( name          = f'{simpl_name}_summary',
+                                                       start_cell    = ExcelCell( 1, 1 ),
+                                                       sheet         = sheet,
+                                                       tx_table_name = transaction_table_name, 
+                                                       statements    = new_statements,
+                                                       categorizer   = categorizer )
     cell_cursor.col += 2
     cell_cursor.row  = 1
 
-    cell_cursor = self.MakeTransactionTable( name          = transaction_table_name, 
-                                             start_cell    = cell_cursor,
-                                             sheet         = sheet, 
-                                             statements    = new_statements )
+    with profiling.Stage( 'transaction table' ):
+      cell_cursor = self.MakeTransactionTable( name          = transaction_table_name, 
+                                               start_cell    = cell_cursor,
+                                               sheet         = sheet, 
+                                               statements    = new_statements )
+    return worksheet_name
 
   #------------------------------------------------------------------------------------------------
   # returns the bottom right cell
   def MakeTransactionTable( self, name: str, start_cell: ExcelCell, sheet : openpyxl.worksheet.worksheet, statements : List[ Statement ] ) -> ExcelCell:
     all_tx = [ tx for stmt in statements for tx in stmt.transactions  ]
     all_tx.sort( key=lambda x : x.date, reverse=True)
+    profiling.Count( 'rows', len( all_tx ) )
+
+    if self.fast_write:
+      return self.WriteTransactionRows( name, start_cell, sheet, all_tx )
 
-    sheet[ str( start_cell ) ] = 'Transactions'
+    sheet.cell( row=start_cell.row, column=start_cell.col ).value = 'Transactions'
     start_cell.row += 1
     cursor : ExcelCursor = ExcelCursor( start_cell, 8 )
 
     table_start = start_cell
-    table_end   = None
-
-    sheet[ str( cursor.inc() ) ] = 'Date'
-    sheet[ str( cursor.inc() ) ] = 'Amount'
-    sheet[ str( cursor.inc() ) ] = 'Account'
-    sheet[ str( cursor.inc() ) ] = 'Account Type'
-    sheet[ str( cursor.inc() ) ] = 'Description'
-    sheet[ str( cursor.inc() ) ] = 'Category'
-    sheet[ str( cursor.inc() ) ] = 'Matched Transfer'
-    sheet[ str( cursor.inc() ) ] = 'Is Debt'
+    last_cell   = None
+
+    cursor.Write( sheet, 'Date' )
+    cursor.Write( sheet, 'Amount' )
+    cursor.Write( sheet, 'Account' )
+    cursor.Write( sheet, 'Account Type' )
+    cursor.Write( sheet, 'Description' )
+    cursor.Write( sheet, 'Category' )
+    cursor.Write( sheet, 'Matched Transfer' )
+    cursor.Write( sheet, 'Is Debt' )
     for tx in all_tx:
-      sheet[ str( cursor.inc() ) ] = tx.date.strftime( '%m/%d/%Y' )
-
-      amt_cell = cursor.inc()
-      sheet[ str( amt_cell ) ] = float(tx.amount.AsExcel())
-      sheet[ str( amt_cell ) ].number_format = "$0.00"
-
-      sheet[ str( cursor.inc() ) ] = str( tx.account )
-      sheet[ str( cursor.inc() ) ] = str( tx.account.bank_info.type.name )
-      sheet[ str( cursor.inc() ) ] = tx.name
-      sheet[ str( cursor.inc() ) ] = tx.category
-
-      sheet[ str( cursor.inc() ) ] = 'TRUE' if tx.matched_transfer else 'FALSE'
-      table_end = cursor.inc()
-      sheet[ str( table_end ) ] = 'TRUE' if tx.is_debt else 'FALSE'
-
+      cursor.Write( sheet, tx.date.strftime( '%m/%d/%Y' ) )
+      cursor.Write( sheet, tx.amount.AsFloat() ).number_format = "$0.00"
+      cursor.Write( sheet, str( tx.account ) )
+      cursor.Write( sheet, str( tx.account.bank_info.type.name ) )
+      cursor.Write( sheet, tx.name )
+      cursor.Write( sheet, tx.category )
+      cursor.Write( sheet, 'TRUE' if tx.matched_transfer else 'FALSE' )
+      last_cell = cursor.Write( sheet, 'TRUE' if tx.is_debt else 'FALSE' )
+
+    table_end   = ExcelCell( last_cell.column, last_cell.row ) if last_cell is not None else None
     stmt_table  = Table( displayName=name, ref=f'{str( table_start ) }:{ str( table_end ) }' )
     table_style = TableStyleInfo( name='TableStyleMedium9', showRowStripes=True )
     stmt_table.tableStyleInfo = table_style
     sheet.add_table( stmt_table )
-  
+
+    return table_end
+
   #------------------------------------------------------------------------------------------------
   # returns the bottom right cell
   def MakeSummaryTable( self, name : str, start_cell : ExcelCell, sheet : openpyxl.worksheet.worksheet, tx_table_name : str, statements : List[ Statement ], categorizer : Categorizer ) -> ExcelCell:
-    sheet[ str( start_cell ) ] = 'Summary'
-    cell = copy.deepcopy( start_cell )
-    cell.row += 1
-
-    table_start = cell
-    table_end   = None
-    cursor = ExcelCursor( cell, len( statements ) + 2 )
+    sheet.cell( row=start_cell.row, column=start_cell.col ).value = 'Summary'
+    table_start = ExcelCell( start_cell.col, start_cell.row + 1 )
+    last_cell   = None
+    cursor      = ExcelCursor( table_start, len( statements ) + 2 )
 
-    sheet[ str( cursor.inc() ) ] = 'Category'
-    sheet[ str( cursor.inc() ) ] = 'Totals'
+    cursor.Write( sheet, 'Category' )
+    cursor.Write( sheet, 'Totals' )
     for stmt in statements:
-      sheet[ str( cursor.inc() ) ] = str( stmt.account )
+      cursor.Write( sheet, str( stmt.account ) )
 
-    sheet[ str( cursor.inc() ) ] = 'Debt Change'
-    sheet[ str( cursor.inc() ) ] = f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Is Debt], "*TRUE*" )'
-    for stmt in statements:
-      sheet[ str( cursor.inc() ) ] = f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Is Debt], "*TRUE*", {tx_table_name}[Account], "*{str(stmt.account)}*")'
-    
-    sheet[ str( cursor.inc() ) ] = 'Expenses'
-    sheet[ str( cursor.inc() ) ] = f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Amount], "<0", {tx_table_name}[Matched Transfer], "*FALSE*")'
-    for stmt in statements:
-      sheet[ str( cursor.inc() ) ] = f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Amount], "<0", {tx_table_name}[Account], "*{str(stmt.account)}*", {tx_table_name}[Matched Transfer], "*FALSE*")'
+    summary_groups = SummarizeTransactions( statements ) if self.static_summary else None
+    for label, total_formula, total_filter, acct_formula, acct_filter in SummaryRows( tx_table_name, categorizer ):
+      cursor.Write( sheet, label )
 
-    sheet[ str( cursor.inc() ) ] = 'Total Revenue'
-    sheet[ str( cursor.inc() ) ] = f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Amount], ">0", {tx_table_name}[Matched Transfer], "*FALSE*" )'
-    for stmt in statements:
-      sheet[ str( cursor.inc() ) ] = f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Amount], ">0", {tx_table_name}[Account], "*{str(stmt.account)}*" )'
+      if summary_groups is None:
+        cursor.Write( sheet, total_formula )
+      else:
+        cursor.Write( sheet, SumGroups( summary_groups, total_filter ) ).number_format = "$0.00"
 
-    sheet[ str( cursor.inc() ) ] = 'Cash Flow'
-    sheet[ str( cursor.inc() ) ] = f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Matched Transfer], "*FALSE*", {tx_table_name}[Is Debt], "*FALSE*" )'
-    for stmt in statements:
-      sheet[ str( cursor.inc() ) ] = f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Account], "*{str(stmt.account)}*", {tx_table_name}[Is Debt], "*FALSE*")'
+      for stmt in statements:
+        acct_name = str( stmt.account )
+        if summary_groups is None:
+          last_cell = cursor.Write( sheet, acct_formula( acct_name ) )
+        else:
+          last_cell = cursor.Write( sheet, SumAccountGroups( summary_groups, acct_filter, acct_name ) )
+          last_cell.number_format = "$0.00"
+
+    table_end   = ExcelCell( last_cell.column, last_cell.row ) if last_cell is not None else None
+    stmt_table  = Table( displayName=name, ref=f'{str( table_start ) }:{ str( table_end ) }' )
+    table_style = TableStyleInfo( name='TableStyleMedium9', showRowStripes=True )
+    stmt_table.tableStyleInfo = table_style
+    sheet.add_table( stmt_table )
 
-    sheet[ str( cursor.inc() ) ] = 'Net Change'
-    sheet[ str( cursor.inc() ) ] = f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Matched Transfer], "*FALSE*" )'
-    for stmt in statements:
-      sheet[ str( cursor.inc() ) ] = f'=SUMIFS({tx_table_name}[Amount], {tx_table_name}[Account], "*{str(stmt.account)}*" )'
+    return table_end
 
-    for cat in categorizer.categories:
-      sheet[ str( cursor.inc() ) ] = cat
-      sheet[ str( cursor.inc() ) ] = f'=SUMIFS( {tx_table_name}[Amount], {tx_table_name}[Category], "*{cat}*" )'
-      for stmt in statements:
-        table_end = cursor.inc()
-        sheet[ str( table_end ) ] = f'=SUMIFS( {tx_table_name}[Amount], {tx_table_name}[Category], "*{cat}*", {tx_table_name}[Account], "*{str(stmt.account)}*" )'
+  #------------------------------------------------------------------------------------------------
+  # writes a row of values starting at (row, col), returns the cells written
+  def WriteRow( self, sheet : openpyxl.worksheet.worksheet, row : int, col : int, values : List ) -> List:
+    return [ sheet.cell( row=row, column=col + offset, value=value ) for offset, value in enumerate( values ) ]
 
-    stmt_table  = Table( displayName=name, ref=f'{str( table_start ) }:{ str( table_end ) }' )
+  #------------------------------------------------------------------------------------------------
+  # same table as MakeTransactionTable, written row by row. returns the bottom right cell
+  def WriteTransactionRows( self, name: str, start_cell: ExcelCell, sheet : openpyxl.worksheet.worksheet, all_tx : List[ Transaction ] ) -> ExcelCell:
+    first_col = start_cell.col
+    title_row = start_cell.row
+    sheet.cell( row=title_row, column=first_col, value='Transactions' )
+
+    header_row = title_row + 1
+    self.WriteRow( sheet, header_row, first_col, [ 'Date', 'Amount', 'Account', 'Account Type', 'Description', 'Category', 'Matched Transfer', 'Is Debt' ] )
+
+    account_names : Dict[ int, Tuple[ str, str ] ] = {}
+    row = header_row
+    for tx in all_tx:
+      row += 1
+      account_name = account_names.get( id( tx.account ) )
+      if account_name is None:
+        account_name = ( str( tx.account ), str( tx.account.bank_info.type.name ) )
+        account_names[ id( tx.account ) ] = account_name
+
+      cells = self.WriteRow( sheet, row, first_col, [ tx.date.strftime( '%m/%d/%Y' ),
+                                                      tx.amount.AsFloat(),
+                                                      account_name[0],
+                                                      account_name[1],
+                                                      tx.name,
+                                                      tx.category,
+                                                      'TRUE' if tx.matched_transfer else 'FALSE',
+                                                      'TRUE' if tx.is_debt else 'FALSE' ] )
+      cells[1].number_format = "$0.00"
+
+    last_col    = first_col + 7
+    table_ref   = f'{ExcelCell( first_col, header_row )}:{ExcelCell( last_col, row )}'
+    stmt_table  = Table( displayName=name, ref=table_ref )
     table_style = TableStyleInfo( name='TableStyleMedium9', showRowStripes=True )
     stmt_table.tableStyleInfo = table_style
     sheet.add_table( stmt_table )
 
-    return table_end
\ No newline at end of file
+    return ExcelCell( last_col, row )
+
+#------------------------------------------------------------------------------------------------
+# period workbooks built by worker processes with AppendPeriods. Each worker gets its own
+#  WorkbookMaker and the categorizer once, when the pool starts
+g_WorkerBookMaker   : Optional[ WorkbookMaker ] = None
+g_WorkerCategorizer : Optional[ Categorizer ]   = None
+
+def InitPeriodWorker( path : str, fast_write : bool, static_summary : bool, categorizer : Categorizer ) -> None:
+  global g_WorkerBookMaker, g_WorkerCategorizer
+  g_WorkerBookMaker   = WorkbookMaker( path, fast_write=fast_write, static_summary=static_summary, split_periods=True )
+  g_WorkerCategorizer = categorizer
+
+def WritePeriodInWorker( statements : List[ Statement ] ) -> str:
+  worksheet_name = g_WorkerBookMaker.AppendStatements( statements, g_WorkerCategorizer )
+  g_WorkerBookMaker.Save()
+  g_WorkerBookMaker.period_workbooks = {}
+  return worksheet_name
\ No newline at end of file